@@ -13,6 +13,15 @@ python isaaclab/scripts/tools/convert_mesh.py \
         --inertia 0.00195 0.00195 0.000246 --principal-axes 1 0 0 0 \
         --static-friction 0.6 --dynamic-friction 0.5 --restitution 0.2 \
         --friction-combine average --restitution-combine min
+
+Resident mode keeps the Kit app alive and converts one mesh per request, so
+the pipeline does not pay for an app launch on every job:
+
+python isaac_scripts/convert_mesh.py --serve 127.0.0.1:8771 --kit_args='--headless'
+
+Each request is one JSON line on a fresh connection, with the CLI option names
+as keys ("input", "output", "mass", "static_friction", "collision_approximation", ...).
+The reply is one JSON line: {"ok": true, "usd_path": ...} or {"ok": false, "error": ...}.
 """
 
 import argparse
@@ -23,8 +32,15 @@ from isaaclab.app import AppLauncher
 # CLI
 # -----------------------------------------------------------------------------
 parser = argparse.ArgumentParser(description="Utility to convert a mesh file into USD format.")
-parser.add_argument("input", type=str, help="The path to the input mesh file.")
-parser.add_argument("output", type=str, help="The path to store the USD file.")
+parser.add_argument("input", type=str, nargs="?", help="The path to the input mesh file.")
+parser.add_argument("output", type=str, nargs="?", help="The path to store the USD file.")
+parser.add_argument(
+    "--serve",
+    type=str,
+    default=None,
+    metavar="ADDRESS",
+    help="Stay resident and serve conversion requests on HOST:PORT or a Unix socket path.",
+)
 parser.add_argument(
     "--make-instanceable",
     action="store_true",
@@ -99,6 +115,8 @@ parser.add_argument(
 # Append AppLauncher args and parse
 AppLauncher.add_app_launcher_args(parser)
 args_cli = parser.parse_args()
+if args_cli.serve is None and (args_cli.input is None or args_cli.output is None):
+    parser.error("input and output are required unless --serve is given")
 
 # Launch Omniverse app
 app_launcher = AppLauncher(args_cli)
@@ -108,7 +126,9 @@ simulation_app = app_launcher.app
 # Imports that require app context
 # -----------------------------------------------------------------------------
 import contextlib
+import json
 import os
+import socket
 
 import carb
 import isaacsim.core.utils.stage as stage_utils
@@ -128,15 +148,15 @@ except Exception:
     PhysxSchema = None
 
 
-def _any_material_args_provided():
+def _any_material_args_provided(opts):
     return any(
         v is not None
         for v in (
-            args_cli.static_friction,
-            args_cli.dynamic_friction,
-            args_cli.restitution,
-            args_cli.friction_combine,
-            args_cli.restitution_combine,
+            opts.static_friction,
+            opts.dynamic_friction,
+            opts.restitution,
+            opts.friction_combine,
+            opts.restitution_combine,
         )
     )
 
@@ -154,18 +174,19 @@ def _bind_physics_material_robust(prim: Usd.Prim, mat: UsdShade.Material):
         print(f"Bound physics material via 'physics:material:binding' relationship to {prim.GetPath()}.")
 
 
-def main():
+def convert(opts) -> str:
+    """Convert one mesh as described by *opts* (CLI-shaped namespace); return the USD path."""
     # Validate mesh path
-    mesh_path = args_cli.input if os.path.isabs(args_cli.input) else os.path.abspath(args_cli.input)
+    mesh_path = opts.input if os.path.isabs(opts.input) else os.path.abspath(opts.input)
     if not check_file_path(mesh_path):
         raise ValueError(f"Invalid mesh file path: {mesh_path}")
 
     # Destination path
-    dest_path = args_cli.output if os.path.isabs(args_cli.output) else os.path.abspath(args_cli.output)
+    dest_path = opts.output if os.path.isabs(opts.output) else os.path.abspath(opts.output)
 
     # Mass / rigid props
-    if (args_cli.mass is not None) or (args_cli.density is not None):
-        mass_props = schemas_cfg.MassPropertiesCfg(mass=args_cli.mass, density=args_cli.density)
+    if (opts.mass is not None) or (opts.density is not None):
+        mass_props = schemas_cfg.MassPropertiesCfg(mass=opts.mass, density=opts.density)
         rigid_props = schemas_cfg.RigidBodyPropertiesCfg()
     else:
         mass_props = None
@@ -173,7 +194,7 @@ def main():
 
     # Collision props
     collision_props = schemas_cfg.CollisionPropertiesCfg(
-        collision_enabled=args_cli.collision_approximation != "none"
+        collision_enabled=opts.collision_approximation != "none"
     )
 
     # Converter config
@@ -185,8 +206,8 @@ def main():
         force_usd_conversion=True,
         usd_dir=os.path.dirname(dest_path),
         usd_file_name=os.path.basename(dest_path),
-        make_instanceable=args_cli.make_instanceable,
-        collision_approximation=args_cli.collision_approximation,
+        make_instanceable=opts.make_instanceable,
+        collision_approximation=opts.collision_approximation,
     )
 
     # Info
@@ -202,8 +223,8 @@ def main():
     print("-" * 80)
 
     # Post-conversion USD edits
-    need_mass_edit = (args_cli.com is not None) or (args_cli.inertia is not None) or (args_cli.principal_axes is not None)
-    need_material = _any_material_args_provided()
+    need_mass_edit = (opts.com is not None) or (opts.inertia is not None) or (opts.principal_axes is not None)
+    need_material = _any_material_args_provided(opts)
 
     if need_mass_edit or need_material:
         stage = Usd.Stage.Open(mesh_converter.usd_path)
@@ -216,16 +237,16 @@ def main():
         # MassAPI edits
         if need_mass_edit:
             mass_api = UsdPhysics.MassAPI.Apply(prim)
-            if args_cli.com is not None:
-                x, y, z = args_cli.com
+            if opts.com is not None:
+                x, y, z = opts.com
                 mass_api.CreateCenterOfMassAttr().Set(Gf.Vec3f(float(x), float(y), float(z)))
                 print(f"Set centerOfMass to: ({x}, {y}, {z})")
-            if args_cli.inertia is not None:
-                ixx, iyy, izz = args_cli.inertia
+            if opts.inertia is not None:
+                ixx, iyy, izz = opts.inertia
                 mass_api.CreateDiagonalInertiaAttr().Set(Gf.Vec3f(float(ixx), float(iyy), float(izz)))
                 print(f"Set diagonalInertia to: ({ixx}, {iyy}, {izz})")
-            if args_cli.principal_axes is not None:
-                qw, qx, qy, qz = args_cli.principal_axes
+            if opts.principal_axes is not None:
+                qw, qx, qy, qz = opts.principal_axes
                 mass_api.CreatePrincipalAxesAttr().Set(Gf.Quatf(float(qw), float(qx), float(qy), float(qz)))
                 print(f"Set principalAxes (quat) to: ({qw}, {qx}, {qy}, {qz})")
             print("USD mass properties updated (MassAPI).")
@@ -236,31 +257,31 @@ def main():
             mat = UsdShade.Material.Define(stage, mat_path)
 
             mat_api = UsdPhysics.MaterialAPI.Apply(mat.GetPrim())
-            if args_cli.static_friction is not None:
-                mat_api.CreateStaticFrictionAttr().Set(float(args_cli.static_friction))
-                print(f"Set staticFriction: {args_cli.static_friction}")
-            if args_cli.dynamic_friction is not None:
-                mat_api.CreateDynamicFrictionAttr().Set(float(args_cli.dynamic_friction))
-                print(f"Set dynamicFriction: {args_cli.dynamic_friction}")
-            if args_cli.restitution is not None:
-                mat_api.CreateRestitutionAttr().Set(float(args_cli.restitution))
-                print(f"Set restitution: {args_cli.restitution}")
+            if opts.static_friction is not None:
+                mat_api.CreateStaticFrictionAttr().Set(float(opts.static_friction))
+                print(f"Set staticFriction: {opts.static_friction}")
+            if opts.dynamic_friction is not None:
+                mat_api.CreateDynamicFrictionAttr().Set(float(opts.dynamic_friction))
+                print(f"Set dynamicFriction: {opts.dynamic_friction}")
+            if opts.restitution is not None:
+                mat_api.CreateRestitutionAttr().Set(float(opts.restitution))
+                print(f"Set restitution: {opts.restitution}")
 
             if PhysxSchema is not None:
                 physx_api = PhysxSchema.PhysxMaterialAPI.Apply(mat.GetPrim())
-                if args_cli.friction_combine is not None:
-                    physx_api.CreateFrictionCombineModeAttr().Set(args_cli.friction_combine)
-                    print(f"Set PhysX frictionCombineMode: {args_cli.friction_combine}")
-                if args_cli.restitution_combine is not None:
-                    physx_api.CreateRestitutionCombineModeAttr().Set(args_cli.restitution_combine)
-                    print(f"Set PhysX restitutionCombineMode: {args_cli.restitution_combine}")
+                if opts.friction_combine is not None:
+                    physx_api.CreateFrictionCombineModeAttr().Set(opts.friction_combine)
+                    print(f"Set PhysX frictionCombineMode: {opts.friction_combine}")
+                if opts.restitution_combine is not None:
+                    physx_api.CreateRestitutionCombineModeAttr().Set(opts.restitution_combine)
+                    print(f"Set PhysX restitutionCombineMode: {opts.restitution_combine}")
             else:
-                if (args_cli.friction_combine is not None) or (args_cli.restitution_combine is not None):
+                if (opts.friction_combine is not None) or (opts.restitution_combine is not None):
                     print("Warning: PhysxSchema not available; combine modes ignored.")
 
             _bind_physics_material_robust(prim, mat)
 
-            if args_cli.collision_approximation == "none":
+            if opts.collision_approximation == "none":
                 print("Note: collision_approximation='none' — no collider present; "
                       "physics material will take effect only if a collider is added later.")
 
@@ -269,7 +290,71 @@ def main():
         print("USD edits saved.")
         print("-" * 80)
 
+    return mesh_converter.usd_path
+
+
+# Request keys a conversion server accepts (CLI dests, minus app/serve flags).
+_REQUEST_KEYS = (
+    "input", "output", "make_instanceable", "collision_approximation", "mass", "density",
+    "com", "inertia", "principal_axes", "static_friction", "dynamic_friction", "restitution",
+    "friction_combine", "restitution_combine",
+)
+
+
+def _request_opts(request: dict):
+    """CLI-shaped namespace for one request: parser defaults overridden by the request."""
+    unknown = set(request) - set(_REQUEST_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown request keys: {sorted(unknown)}")
+    if not request.get("input") or not request.get("output"):
+        raise ValueError("Request needs 'input' and 'output'")
+    opts = argparse.Namespace(**{k: parser.get_default(k) for k in _REQUEST_KEYS})
+    for k, v in request.items():
+        setattr(opts, k, v)
+    return opts
+
+
+def _listen(address: str) -> socket.socket:
+    if address.startswith("/"):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(address)
+    else:
+        host, port = address.rsplit(":", 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, int(port)))
+    sock.listen(16)
+    return sock
+
+
+def serve(address: str):
+    """Handle conversion requests one at a time, reusing this Kit app."""
+    sock = _listen(address)
+    sock.settimeout(1.0)
+    print(f"[INFO] Conversion server listening on {address}")
+    while simulation_app.is_running():
+        try:
+            conn, _ = sock.accept()
+        except socket.timeout:
+            simulation_app.update()  # keep the app ticking while idle
+            continue
+        with conn:
+            conn.settimeout(None)
+            try:
+                request = json.loads(conn.makefile("r").readline())
+                reply = {"ok": True, "usd_path": convert(_request_opts(request))}
+            except Exception as e:
+                print(f"[ERROR] Conversion failed: {e!r}")
+                reply = {"ok": False, "error": repr(e)}
+            with contextlib.suppress(OSError):
+                conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+
 
 if __name__ == "__main__":
-    main()
+    if args_cli.serve:
+        serve(args_cli.serve)
+    else:
+        convert(args_cli)
     simulation_app.close()
@@ -1,8 +1,17 @@
 # SPDX-License-Identifier: BSD-3-Clause
 # Spawn scene and (optionally) record a single iteration to MP4 using viewport capture (no Replicator).
+#
+# Worker mode (--serve HOST:PORT or a Unix socket path) keeps the app, ground, light and
+# pyramid loaded and records one throw per request: the custom object is swapped in, the
+# sim reset, and the video written. Each request is one JSON line on a fresh connection:
+#   {"usd_path": "...", "scaling_factor": 0.2, "video_name": "00005.mp4", "out_dir": "..."}
+# and the reply is {"ok": true, "video_path": "..."} or {"ok": false, "error": "..."}.
 
 import argparse
+import contextlib
+import json
 import os
+import socket
 import shutil
 import subprocess
 import glob
@@ -33,6 +42,9 @@ parser.add_argument("--scaling_factor", type=float, default=1.0, help="Scaling f
 # NEW: how many captured frames to skip at the start of the video
 parser.add_argument("--skip_first", type=int, default=10, help="Skip the first N frames when encoding the video.")
 
+parser.add_argument("--serve", type=str, default=None, metavar="ADDRESS",
+                    help="Stay resident and record one throw per request on HOST:PORT or a Unix socket path.")
+
 # Isaac Lab defaults (device, experience, etc.)
 AppLauncher.add_app_launcher_args(parser)
 args_cli = parser.parse_args()
@@ -88,18 +100,24 @@ def throw_object(prim_path: str, direction=(1.0, 0.0, 0.5), speed=8.0):
     rb.CreateRigidBodyEnabledAttr(True)
     rb.GetVelocityAttr().Set(Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])))
 
-def design_scene(scale=1.0):
+CUSTOM_OBJ_PATH = "/World/Objects/custom_obj"
+
+def design_scene():
     cfg_ground = sim_utils.GroundPlaneCfg()
     cfg_ground.func("/World/defaultGroundPlane", cfg_ground)
     cfg_light_distant = sim_utils.DistantLightCfg(intensity=5000.0, color=(0.75, 0.75, 0.75))
     cfg_light_distant.func("/World/lightDistant", cfg_light_distant, translation=(1, 0, 10))
+
+def spawn_custom_obj(usd_path: str, scale=1.0):
+    if prim_utils.is_prim_path_valid(CUSTOM_OBJ_PATH):
+        prim_utils.delete_prim(CUSTOM_OBJ_PATH)
     custom_obj_cfg = sim_utils.UsdFileCfg(
-        usd_path=f"{args_cli.usd_path_abs}",
+        usd_path=f"{usd_path}",
         scale=(scale, scale, scale),
         collision_props=sim_utils.CollisionPropertiesCfg(),
     )
     custom_obj_cfg.func(
-        "/World/Objects/custom_obj",
+        CUSTOM_OBJ_PATH,
         custom_obj_cfg,
         translation=(0.0, 0.0, 2.0),
         orientation=(0.4207, 0.5609, 0.5609, 0.4370),
@@ -149,39 +167,14 @@ def _detect_rgb_pattern(frames_dir: str):
 # ---------------------------
 # Main
 # ---------------------------
-def main():
-    # Simulation context
-    sim_cfg = sim_utils.SimulationCfg(dt=0.01, device=args_cli.device)
-    sim = sim_utils.SimulationContext(sim_cfg)
-
-    # Camera
-    sim.set_camera_view([0.0, -4.0, 4.0], [0.0, 0.0, 3.0])
-
-    # Scene
-    design_scene(scale=args_cli.scaling_factor)
-    build_pyramid("/World/Objects/Pyramid", levels=20, cube_size=0.15, gap=0.00, base_xy=(0.0, 10.0), z0=0.075)
-    throw_object("/World/Objects/custom_obj", direction=(0.0, 1.0, 0.1), speed=17.0)
-
-    # Initialize
-    sim.reset()
-    print("[INFO]: Setup complete.")
-
-    # If not recording, just run one pass for video_length steps and exit (no file I/O)
-    if not args_cli.video:
-        steps = max(1, args_cli.video_length)
-        print(f"[INFO] Running {steps} steps (no recording).")
-        start = time.time()
-        for _ in range(steps):
-            sim.step()
-        print(f"[INFO] Done in {time.time() - start:.2f}s.")
-        return
-
-    # --- Recording path: viewport capture (no Replicator) ---
+def record(sim, out_dir: str, video_name: str):
+    """Step the sim for --video_length steps, capturing frames, and encode them; returns the MP4 path."""
     print("[INFO] Recording video (viewport capture, no Replicator)...")
 
-    # Prepare output dirs (clean slate)
-    out_dir = os.path.abspath(args_cli.out_dir)
-    frames_dir = os.path.join(out_dir, "frames")
+    # Prepare output dirs (clean slate). Frames go to a directory named after the
+    # video, so workers and one-off runs sharing out_dir never mix their frames.
+    out_dir = os.path.abspath(out_dir)
+    frames_dir = os.path.join(out_dir, f"frames_{os.path.splitext(os.path.basename(video_name))[0]}")
     if os.path.isdir(frames_dir):
         shutil.rmtree(frames_dir)
     os.makedirs(frames_dir, exist_ok=True)
@@ -229,12 +222,12 @@ def main():
     pattern, sample = _detect_rgb_pattern(frames_dir)
     if not pattern:
         print("[ERROR] No frames found in:", frames_dir)
-        return
+        return None
 
     print("[INFO] Saved the image sequence.")
 
-    video_path = os.path.join(out_dir, args_cli.video_name if args_cli.video_name.endswith(".mp4")
-                              else args_cli.video_name + ".mp4")
+    video_path = os.path.join(out_dir, video_name if video_name.endswith(".mp4")
+                              else video_name + ".mp4")
 
     # Clamp skip to available range to avoid empty outputs
     effective_skip = max(0, int(args_cli.skip_first))
@@ -251,17 +244,106 @@ def main():
         print(f'       ffmpeg -y -framerate {args_cli.fps} -start_number {effective_skip} '
               f'-pattern_type sequence -i "{os.path.join(frames_dir, pattern)}" '
               f'-c:v libx264 -pix_fmt yuv420p -movflags +faststart "{video_path}"')
+        return None
 
     if os.path.isdir(frames_dir):
         print(f"[INFO] Cleaning up frame directory: {frames_dir}")
         shutil.rmtree(frames_dir, ignore_errors=True)
 
+    print(f"[INFO] Done. Video: {video_path}")
+    return video_path
+
+def setup_sim():
+    """Simulation context, camera and the static part of the scene (ground, light, pyramid)."""
+    sim_cfg = sim_utils.SimulationCfg(dt=0.01, device=args_cli.device)
+    sim = sim_utils.SimulationContext(sim_cfg)
+
+    # Camera
+    sim.set_camera_view([0.0, -4.0, 4.0], [0.0, 0.0, 3.0])
+
+    # Scene
+    design_scene()
+    build_pyramid("/World/Objects/Pyramid", levels=20, cube_size=0.15, gap=0.00, base_xy=(0.0, 10.0), z0=0.075)
+    return sim
+
+def load_throw(sim, usd_path: str, scale: float):
+    """Swap in the object to throw and reset the sim; stopping first restores the pyramid."""
+    sim.stop()
+    spawn_custom_obj(usd_path, scale=scale)
+    throw_object(CUSTOM_OBJ_PATH, direction=(0.0, 1.0, 0.1), speed=17.0)
+    sim.reset()
+
+def _listen(address: str) -> socket.socket:
+    if address.startswith("/"):
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(address)
     else:
-        print(f"[INFO] Done. Video: {video_path}")
+        host, port = address.rsplit(":", 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, int(port)))
+    sock.listen(16)
+    return sock
+
+def serve(address: str):
+    """Record one throw per request, keeping the app, renderer and base scene warm."""
+    sim = setup_sim()
+    sim.reset()
+    sock = _listen(address)
+    sock.settimeout(1.0)
+    print(f"[INFO] Simulation worker listening on {address}")
+    while simulation_app.is_running():
+        try:
+            conn, _ = sock.accept()
+        except socket.timeout:
+            simulation_app.update()  # keep the app ticking while idle
+            continue
+        with conn:
+            conn.settimeout(None)
+            try:
+                request = json.loads(conn.makefile("r").readline())
+                load_throw(sim, request["usd_path"], float(request.get("scaling_factor", 1.0)))
+                video_path = record(sim, request.get("out_dir", args_cli.out_dir),
+                                    request.get("video_name", args_cli.video_name))
+                if video_path is None:
+                    raise RuntimeError("No video was encoded")
+                reply = {"ok": True, "video_path": video_path}
+            except Exception as e:
+                print(f"[ERROR] Recording failed: {e!r}")
+                reply = {"ok": False, "error": repr(e)}
+            with contextlib.suppress(OSError):
+                conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+
+def main():
+    sim = setup_sim()
+    spawn_custom_obj(args_cli.usd_path_abs, scale=args_cli.scaling_factor)
+    throw_object(CUSTOM_OBJ_PATH, direction=(0.0, 1.0, 0.1), speed=17.0)
+
+    # Initialize
+    sim.reset()
+    print("[INFO]: Setup complete.")
+
+    # If not recording, just run one pass for video_length steps and exit (no file I/O)
+    if not args_cli.video:
+        steps = max(1, args_cli.video_length)
+        print(f"[INFO] Running {steps} steps (no recording).")
+        start = time.time()
+        for _ in range(steps):
+            sim.step()
+        print(f"[INFO] Done in {time.time() - start:.2f}s.")
+        return
+
+    # --- Recording path: viewport capture (no Replicator) ---
+    record(sim, args_cli.out_dir, args_cli.video_name)
 
 if __name__ == "__main__":
     import sys, os
     #try:
-    main()
+    if args_cli.serve:
+        serve(args_cli.serve)
+    else:
+        main()
     #finally:
-    #    os._exit(0)  # because fuck you
\ No newline at end of file
+    #    os._exit(0)  # because fuck you
@@ -0,0 +1,145 @@
+"""Catalog of converted assets shared by the pipeline and the replay tools.
+
+Every USD the pipeline produces is recorded here with the properties it was
+converted with. It replaces the append-only ``assets.csv``: rows are keyed by
+asset id (the job id that produced the USD), indexed on object type, and
+written in a single transaction, so concurrent jobs cannot interleave lines
+and lookups by type match exactly instead of by substring.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from scan2wall.sqlite_local import LocalConnection
+
+ASSET_CATALOG_PATH = Path(os.getenv("ASSET_CATALOG_PATH", "/workspace/scan2wall/assets.db"))
+# Imported once into a fresh catalog so assets recorded before it existed stay findable.
+LEGACY_ASSETS_CSV = Path(os.getenv("LEGACY_ASSETS_CSV", "/workspace/scan2wall/assets.csv"))
+
+
+@dataclass
+class Asset:
+    id: str
+    obj_type: str
+    usd_file: str
+    scaling: float = 1.0
+    mass: Optional[float] = None
+    static_friction: Optional[float] = None
+    dynamic_friction: Optional[float] = None
+    confidence: Optional[float] = None
+    created_at: float = 0.0
+
+
+def normalize_type(obj_type: str) -> str:
+    """Canonical spelling of an object type used as the lookup key."""
+    return " ".join(str(obj_type).lower().split())
+
+
+class AssetCatalog:
+    """SQLite-backed asset catalog. Safe to share between threads."""
+
+    def __init__(self, db_path: Path = ASSET_CATALOG_PATH, legacy_csv: Optional[Path] = LEGACY_ASSETS_CSV):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = LocalConnection(self.db_path)
+        self._init_schema(legacy_csv)
+
+    def _init_schema(self, legacy_csv: Optional[Path]) -> None:
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS assets ("
+            "id TEXT PRIMARY KEY, obj_type TEXT NOT NULL, usd_file TEXT NOT NULL, "
+            "scaling REAL, mass REAL, static_friction REAL, dynamic_friction REAL, "
+            "confidence REAL, created_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_type_created ON assets (obj_type, created_at)")
+        empty = conn.execute("SELECT 1 FROM assets LIMIT 1").fetchone() is None
+        if empty and legacy_csv is not None and Path(legacy_csv).exists():
+            imported = self.import_csv(legacy_csv)
+            print(f"[INFO] Imported {imported} assets from {legacy_csv}")
+
+    def add(self, asset: Asset) -> Asset:
+        """Insert or replace *asset*; returns it with the normalized type and timestamp."""
+        asset.obj_type = normalize_type(asset.obj_type)
+        asset.created_at = asset.created_at or time.time()
+        row = asdict(asset)
+        names = ", ".join(row)
+        marks = ", ".join(f":{k}" for k in row)
+        self._conn().execute(f"INSERT OR REPLACE INTO assets ({names}) VALUES ({marks})", row)
+        return asset
+
+    def get(self, asset_id: str) -> Optional[Asset]:
+        row = self._conn().execute("SELECT * FROM assets WHERE id = ?", (asset_id,)).fetchone()
+        return Asset(**dict(row)) if row is not None else None
+
+    def find(self, obj_type: str, limit: int = 10) -> List[Asset]:
+        """Assets of exactly *obj_type* (case- and whitespace-insensitive), newest first."""
+        rows = self._conn().execute(
+            "SELECT * FROM assets WHERE obj_type = ? ORDER BY created_at DESC LIMIT ?",
+            (normalize_type(obj_type), int(limit)),
+        ).fetchall()
+        return [Asset(**dict(r)) for r in rows]
+
+    def confident(self, obj_type: str, min_confidence: float, limit: int = 5) -> List[Asset]:
+        """Assets of *obj_type* whose estimate confidence is at least *min_confidence*, best first.
+
+        Assets without a recorded confidence (e.g. imported from the CSV) count as 0.
+        """
+        rows = self._conn().execute(
+            "SELECT * FROM assets WHERE obj_type = ? AND COALESCE(confidence, 0) >= ? "
+            "ORDER BY confidence DESC, created_at DESC LIMIT ?",
+            (normalize_type(obj_type), float(min_confidence), int(limit)),
+        ).fetchall()
+        return [Asset(**dict(r)) for r in rows]
+
+    def latest(self, obj_type: str) -> Optional[Asset]:
+        found = self.find(obj_type, limit=1)
+        return found[0] if found else None
+
+    def import_csv(self, path: Path) -> int:
+        """Load rows of the old ``obj_type,scaling,mass,usd_file`` CSV; returns how many were added.
+
+        The asset id is the USD file stem (the job id), so importing twice is a no-op.
+        """
+        rows = []
+        with open(path, newline="") as f:
+            for i, line in enumerate(csv.reader(f)):
+                if len(line) < 4 or (i == 0 and line[0] == "object"):
+                    continue
+                obj_type, scaling, mass, usd_file = line[0], line[1], line[2], line[-1]
+                rows.append((Path(usd_file).stem, normalize_type(obj_type), usd_file,
+                             float(scaling), float(mass), time.time() + i * 1e-6))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO assets (id, obj_type, usd_file, scaling, mass, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+
+_CATALOG: Optional[AssetCatalog] = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def open_catalog() -> AssetCatalog:
+    """The process-wide catalog at ``ASSET_CATALOG_PATH``, opened on first use."""
+    global _CATALOG
+    with _CATALOG_LOCK:
+        if _CATALOG is None:
+            _CATALOG = AssetCatalog()
+        return _CATALOG
@@ -1,27 +1,102 @@
+import asyncio
+import json
+import os
 import time
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Any, List
-import imghdr
-from fastapi import FastAPI, File, UploadFile, Request, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, RedirectResponse
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi import HTTPException
-from PIL import Image
-import io
-import imghdr
-from fastapi import HTTPException
-from ml_pipeline import process_image
+from ml_pipeline import CACHE as ARTIFACTS, PIPELINE_STAGES, cached_result, process_image, process_image_async, start_properties, start_properties_batch
+from job_store import ACTIVE_STATUSES, FINISHED_STATUSES, open_job_store
+from events import JobEvents
+from ingest import MAX_UPLOAD_BYTES, IngestedForm, IngestedImage, IngestError, ingest_form
+from scheduler import (
+    DEFAULT_PRIORITY,
+    PRIORITY_CLASSES,
+    STAGE_LIMITS,
+    AsyncPipelineScheduler,
+    PipelineScheduler,
+    QueueFull,
+)
+from http_client import aclose_async_client
+from scan2wall.material_properties.get_object_properties import call_stats as gemini_call_stats
+from scan2wall.material_properties.property_cache import open_property_cache
+from metrics import JOB_SECONDS, UPLOAD_VALIDATION_SECONDS, Counter, Gauge, render_metrics
 
 UPLOAD_DIR = Path(__file__).resolve().parent.parent / "uploads"
 PROCESSED_DIR = Path(__file__).resolve().parent.parent / "processed"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="Scan2Mesh")
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", str(Path(__file__).resolve().parent.parent / "jobs.db")))
+JOB_RETENTION_S = float(os.getenv("JOB_RETENTION_S", str(24 * 3600)))
+JOB_PRUNE_INTERVAL_S = float(os.getenv("JOB_PRUNE_INTERVAL_S", "600"))
+SSE_KEEPALIVE_S = 15.0
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "20"))
+# "threads": one worker thread per running job. "asyncio": jobs run as tasks on
+# the server's event loop, so hundreds can be in flight without extra threads.
+PIPELINE_RUNNER = os.getenv("PIPELINE_RUNNER", "threads")
+
+STORE = open_job_store(JOB_DB_PATH)
+EVENTS = JobEvents()
+SCHEDULER: PipelineScheduler  # created below, once _run_pipeline exists
+
+
+async def _prune_loop() -> None:
+    """Periodically move finished jobs out of the hot table and trim the artifact cache."""
+    while True:
+        try:
+            moved = await run_in_threadpool(STORE.prune, JOB_RETENTION_S)
+            if moved:
+                print(f"[INFO] Archived {moved} finished jobs.")
+            evicted = await run_in_threadpool(ARTIFACTS.prune)
+            if evicted:
+                print(f"[CACHE] Evicted {evicted} artifact cache entries.")
+        except Exception as e:
+            print(f"[ERROR] Job pruning failed: {e}")
+        await asyncio.sleep(JOB_PRUNE_INTERVAL_S)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    interrupted = await run_in_threadpool(STORE.fail_interrupted, "Interrupted by server restart")
+    if interrupted:
+        print(f"[WARN] Marked {interrupted} interrupted jobs as failed.")
+    SCHEDULER.start()
+    pruner = asyncio.create_task(_prune_loop())
+    try:
+        yield
+    finally:
+        pruner.cancel()
+        SCHEDULER.shutdown()
+        await aclose_async_client()
+
+
+app = FastAPI(title="Scan2Mesh", lifespan=lifespan)
 templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent / "templates"))
 
-JOBS: Dict[str, Dict[str, Any]] = {}
+
+@app.middleware("http")
+async def reject_oversize_uploads(request: Request, call_next):
+    """Refuse oversize upload bodies from Content-Length before reading any of them.
+
+    Bodies without a Content-Length (chunked uploads) are capped by ``ingest_form`` as they arrive.
+    """
+    if request.method == "POST" and request.url.path.startswith("/upload"):
+        limit = _upload_limit(request.url.path)
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > limit:
+            return JSONResponse(
+                {"detail": f"🚫 Upload is larger than {limit // (1024 * 1024)} MB."},
+                status_code=413,
+            )
+    return await call_next(request)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -29,85 +104,423 @@ async def upload_page(request: Request):
     return templates.TemplateResponse("upload.html", {"request": request})
 
 @app.post("/upload")
-async def upload_image(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_image(request: Request):
+    """Form fields: ``file`` (the image) and an optional ``priority`` class."""
     print("[INFO] Received file.")
 
-    # --- Step 1: read all bytes once ---
-    contents = await file.read()
-    file.file.seek(0)  # just in case
-    
-    # --- Step 2: signature check ---
-    kind = imghdr.what(None, contents[:512])
-    if kind not in {"jpeg", "png", "webp", "gif", "jpg"}:
-        raise HTTPException(
-            status_code=400,
-            detail=f"🚫 '{file.filename}' is not a valid image. Supported: JPEG, PNG, WEBP, GIF."
+    # --- Step 0: admission control, before the image's bytes are read ---
+    def admit(priority: str, n: int) -> None:
+        if SCHEDULER.is_full(priority):
+            raise _busy(SCHEDULER.retry_after())
+
+    # --- Step 1: stream to disk (signature sniff, size cap, hash, Pillow check) ---
+    form, priority = await _ingest(request, 1, DEFAULT_PRIORITY, admit)
+    if form.rejected:
+        raise HTTPException(status_code=form.rejected[0][1].status_code, detail=form.rejected[0][1].detail)
+    if not form.images:
+        raise HTTPException(status_code=400, detail="🚫 No image in upload.")
+    fname, image = form.images[0]
+
+    job_id = uuid.uuid4().hex
+    # --- Step 2: an identical earlier upload whose outputs all still exist leaves nothing to run ---
+    reused = await run_in_threadpool(_reused_job, job_id, fname, image, priority=priority)
+    if reused is not None:
+        await run_in_threadpool(STORE.create, reused)
+        JOB_SECONDS.observe(0.0, status="done")
+        return JSONResponse(
+            {
+                "message": "✅ File uploaded; results reused from an identical earlier upload.",
+                "job_id": job_id,
+                "filename": fname,
+                "status": "done",
+                "priority": priority,
+                "queue_position": None,
+            },
+            status_code=201,
         )
 
-    # --- Step 3: Pillow validation ---
+    # --- Step 3: queue job ---
+    await run_in_threadpool(STORE.create, _new_job(job_id, fname, image, priority=priority))
+
     try:
-        Image.open(io.BytesIO(contents)).verify()
-    except Exception:
-        raise HTTPException(
-            status_code=400,
-            detail=f"⚠️ '{file.filename}' appears corrupted or unreadable. Try again with a valid image."
+        position = SCHEDULER.submit(job_id, str(image.path), priority=priority)
+    except QueueFull as e:
+        await run_in_threadpool(STORE.update, job_id, status="error", error="Rejected: pipeline queue full")
+        image.path.unlink(missing_ok=True)
+        raise _busy(e.retry_after)
+    # Image-only stages start now, while the job waits for a pipeline worker.
+    start_properties(str(image.path), image.sha256, priority)
+    return JSONResponse(
+        {
+            "message": "✅ File uploaded successfully.",
+            "job_id": job_id,
+            "filename": fname,
+            "status": "queued",
+            "priority": priority,
+            "queue_position": position,
+        },
+        status_code=201,
+    )
+
+@app.post("/upload/batch")
+async def upload_batch(request: Request):
+    """Upload several images at once; each valid image becomes a child job of one batch.
+
+    Form fields: one or more ``files`` and an optional ``priority`` class (default ``batch``).
+    """
+    print("[INFO] Received batch upload.")
+
+    def admit(priority: str, n: int) -> None:
+        if SCHEDULER.free_slots(priority) < n:
+            raise _busy(SCHEDULER.retry_after())
+
+    # Files are validated as they stream in; one bad photo does not sink the batch.
+    form, priority = await _ingest(request, MAX_BATCH_FILES, "batch", admit)
+    accepted = form.images
+    rejected = [{"filename": name, "detail": e.detail} for name, e in form.rejected]
+    total = len(accepted) + len(rejected)
+    print(f"[INFO] Batch of {total} files received.")
+    if not accepted:
+        raise HTTPException(status_code=400, detail={"message": "🚫 No valid images in batch.", "rejected": rejected})
+
+    batch_id = uuid.uuid4().hex
+    jobs, to_run = [], []
+    for fname, image in accepted:
+        job_id = uuid.uuid4().hex
+        job = await run_in_threadpool(_reused_job, job_id, fname, image, batch_id=batch_id, priority=priority)
+        if job is None:
+            job = _new_job(job_id, fname, image, batch_id=batch_id, priority=priority)
+            to_run.append((job_id, image))
+        else:
+            JOB_SECONDS.observe(0.0, status="done")
+        await run_in_threadpool(STORE.create, job)
+        jobs.append((job_id, fname, job["status"]))
+
+    try:
+        positions = SCHEDULER.submit_many([(job_id, (str(image.path),)) for job_id, image in to_run], priority=priority)
+    except QueueFull as e:
+        for job_id, image in to_run:
+            await run_in_threadpool(STORE.update, job_id, status="error", error="Rejected: pipeline queue full")
+            image.path.unlink(missing_ok=True)
+        raise _busy(e.retry_after)
+    queue_positions = dict(zip((job_id for job_id, _ in to_run), positions))
+    # One Gemini request per GEMINI_BATCH_SIZE images rather than one per image.
+    start_properties_batch([(str(image.path), image.sha256) for _, image in to_run], priority)
+    return JSONResponse(
+        {
+            "message": f"✅ {len(jobs)} of {total} files uploaded successfully.",
+            "batch_id": batch_id,
+            "priority": priority,
+            "jobs": [
+                {"job_id": job_id, "filename": fname, "status": status, "queue_position": queue_positions.get(job_id)}
+                for job_id, fname, status in jobs
+            ],
+            "rejected": rejected,
+        },
+        status_code=201,
+    )
+
+@app.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Aggregate progress of a batch upload plus the status of each child job."""
+    jobs = await run_in_threadpool(STORE.batch, batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = {status: 0 for status in (*ACTIVE_STATUSES, *FINISHED_STATUSES)}
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    finished = sum(counts[s] for s in FINISHED_STATUSES)
+    return JSONResponse({
+        "batch_id": batch_id,
+        "total": len(jobs),
+        "finished": finished,
+        "counts": counts,
+        "status": "done" if finished == len(jobs) else "processing",
+        "jobs": [
+            {"job_id": j["id"], "filename": j["filename"], "status": j["status"], "stage": j.get("stage"), "error": j.get("error")}
+            for j in jobs
+        ],
+    })
+
+@app.get("/job/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a processing job."""
+    job = await run_in_threadpool(STORE.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JSONResponse(_job_payload(job))
+
+@app.post("/job/{job_id}/retry")
+async def retry_job(job_id: str, priority: Optional[str] = None):
+    """Re-queue a failed job; it resumes from its first incomplete stage.
+
+    The job keeps the priority class it was uploaded with unless *priority* is given.
+    """
+    job = await run_in_threadpool(STORE.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "error":
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried (status: {job['status']}).")
+    if not Path(job["path"]).exists():
+        raise HTTPException(status_code=410, detail="The uploaded image is no longer available.")
+    priority = _check_priority(priority or job.get("priority") or DEFAULT_PRIORITY)
+
+    try:
+        # queued_at starts this attempt's clock for scan2wall_job_duration_seconds.
+        await run_in_threadpool(
+            _set_job, job_id, status="queued", error=None, stage=None, priority=priority, queued_at=time.time()
+        )
+    except KeyError:
+        raise HTTPException(status_code=409, detail="Job has been archived and can no longer be retried.")
+    try:
+        position = SCHEDULER.submit(job_id, job["path"], priority=priority)
+    except QueueFull as e:
+        await run_in_threadpool(_set_job, job_id, status="error", error=job["error"])
+        raise _busy(e.retry_after)
+    return JSONResponse({
+        "job_id": job_id,
+        "status": "queued",
+        "priority": priority,
+        "queue_position": position,
+        "completed_stages": [s for s in PIPELINE_STAGES if s in (job.get("checkpoints") or {})],
+    })
+
+@app.get("/job/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Stream status updates for a job as Server-Sent Events until it finishes."""
+    if await run_in_threadpool(STORE.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        with EVENTS.subscribe(job_id) as queue:
+            # Snapshot after subscribing so no transition falls in between.
+            event = _job_payload(await run_in_threadpool(STORE.get, job_id))
+            yield f"data: {json.dumps(event)}\n\n"
+            while event["status"] not in FINISHED_STATUSES:
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs")
+async def list_jobs(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    fields: Optional[str] = None,
+):
+    """List jobs newest first, one page at a time (for debugging/admin).
+
+    `status` and `fields` take comma-separated values; pass the returned
+    `next_cursor` back as `cursor` to fetch the following page.
+    """
+    try:
+        jobs, next_cursor = await run_in_threadpool(
+            STORE.list,
+            limit=min(max(limit, 1), 1000),
+            statuses=_split_csv(status),
+            since=since,
+            until=until,
+            cursor=cursor,
+            fields=_split_csv(fields),
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({"jobs": jobs, "next_cursor": next_cursor})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: stage latency histograms, queue and in-flight gauges."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def _split_csv(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+def _busy(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="⏳ The server is busy processing other photos. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)},
+    )
 
-    # --- Step 4: save ---
+def _upload_name(filename: str) -> str:
+    """Unique, sanitized name in UPLOAD_DIR for an uploaded file."""
     ts = time.strftime("%Y%m%d-%H%M%S")
     suffix = uuid.uuid4().hex[:6]
-    safe_name = "".join(ch for ch in Path(file.filename).name if ch.isalnum() or ch in ("-", "_", ".", " ")).strip() or "photo.jpg"
-    fname = f"{ts}-{suffix}-{safe_name}"
-    dest = UPLOAD_DIR / fname
+    safe_name = "".join(ch for ch in Path(filename or "").name if ch.isalnum() or ch in ("-", "_", ".", " ")).strip() or "photo.jpg"
+    return f"{ts}-{suffix}-{safe_name}"
 
-    dest.write_bytes(contents)  # simpler save
+def _upload_limit(path: str) -> int:
+    files = MAX_BATCH_FILES if path == "/upload/batch" else 1
+    return files * (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
 
-    # --- Step 5: queue job ---
-    job_id = uuid.uuid4().hex
-    JOBS[job_id] = {
+async def _ingest(
+    request: Request, max_files: int, default_priority: str, admit: Callable[[str, int], None]
+) -> Tuple[IngestedForm, str]:
+    """Stream the request's form into UPLOAD_DIR as it arrives; returns it with the job priority.
+
+    *admit* is called with the priority and the file count so far as each
+    file starts, and raises to turn the upload away before it is stored.
+    ``IngestError`` becomes the matching HTTP error.
+    """
+    def before_file(fields: Dict[str, str], n: int) -> None:
+        admit(_check_priority(fields.get("priority", default_priority)), n)
+
+    try:
+        with UPLOAD_VALIDATION_SECONDS.time():
+            form = await ingest_form(
+                request.stream(),
+                request.headers.get("content-type", ""),
+                UPLOAD_DIR,
+                _upload_name,
+                max_files=max_files,
+                max_total_bytes=_upload_limit(request.url.path),
+                before_file=before_file,
+            )
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    try:
+        return form, _check_priority(form.fields.get("priority", default_priority))
+    except HTTPException:
+        for _, image in form.images:
+            image.path.unlink(missing_ok=True)
+        raise
+
+def _check_priority(priority: str) -> str:
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"🚫 Unknown priority '{priority}'; use one of: {', '.join(PRIORITY_CLASSES)}.",
+        )
+    return priority
+
+def _new_job(job_id: str, fname: str, image: IngestedImage, **extra: Any) -> Dict[str, Any]:
+    return {
         "id": job_id,
         "filename": fname,
-        "path": str(dest),
+        "path": str(image.path),
         "status": "queued",
         "created_at": time.time(),
         "processed_path": None,
         "error": None,
+        "size": image.size,
+        "sha256": image.sha256,
+        **extra,
     }
 
-    background_tasks.add_task(_run_pipeline, job_id, str(dest))
-    return JSONResponse(
-        {"message": "✅ File uploaded successfully.", "job_id": job_id, "filename": fname, "status": "queued"},
-        status_code=201,
-    )
+def _reused_job(job_id: str, fname: str, image: IngestedImage, **extra: Any) -> Optional[Dict[str, Any]]:
+    """A finished job carrying the outputs of an identical earlier upload, or None if any are gone."""
+    cached = cached_result(image.sha256)
+    if cached is None:
+        return None
+    out_path, checkpoints = cached
+    print(f"[CACHE] Job {job_id} reuses the outputs of an identical earlier upload")
+    return _new_job(job_id, fname, image, status="done", processed_path=out_path, checkpoints=checkpoints, **extra)
 
-@app.get("/job/{job_id}")
-async def get_job_status(job_id: str):
-    """Get the status of a processing job."""
-    if job_id not in JOBS:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    job = JOBS[job_id]
-    return JSONResponse({
+def _job_payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "job_id": job["id"],
         "status": job["status"],
+        "stage": job.get("stage"),
         "filename": job["filename"],
         "created_at": job["created_at"],
         "processed_path": job.get("processed_path"),
         "error": job.get("error"),
-    })
+        "priority": job.get("priority", DEFAULT_PRIORITY),
+        "queue_position": SCHEDULER.position(job["id"]) if job["status"] == "queued" else None,
+    }
 
-@app.get("/jobs")
-async def list_jobs():
-    """List all jobs (for debugging/admin)."""
-    return JSONResponse({"jobs": list(JOBS.values())})
+def _set_job(job_id: str, **fields: Any) -> None:
+    """Persist a job update and push it to any event-stream subscribers."""
+    STORE.update(job_id, **fields)
+    EVENTS.publish(job_id, _job_payload(STORE.get(job_id)))
+
+def _attempt_started(job: Dict[str, Any]) -> float:
+    """When the current attempt was queued: the upload, or the latest retry."""
+    return job.get("queued_at") or job["created_at"]
 
 def _run_pipeline(job_id: str, path: str) -> None:
-    JOBS[job_id]["status"] = "processing"
+    job = STORE.get(job_id)
+    checkpoints = dict(job.get("checkpoints") or {})
+
+    def save_checkpoint(stage: str, record: Dict[str, Any]) -> None:
+        checkpoints[stage] = record
+        STORE.update(job_id, checkpoints=checkpoints)
+
+    _set_job(job_id, status="processing")
     try:
-        out_path = process_image(job_id, path)
-        JOBS[job_id]["status"] = "done"
-        JOBS[job_id]["processed_path"] = out_path
+        out_path = process_image(
+            job_id,
+            path,
+            on_stage=lambda stage: _set_job(job_id, stage=stage),
+            input_hash=job.get("sha256"),
+            checkpoints=checkpoints,
+            on_checkpoint=save_checkpoint,
+        )
+        _set_job(job_id, status="done", processed_path=out_path)
+        JOB_SECONDS.observe(time.time() - _attempt_started(job), status="done")
+    except Exception as e:
+        _set_job(job_id, status="error", error=repr(e))
+        JOB_SECONDS.observe(time.time() - _attempt_started(job), status="error")
+        print(f"[ERROR] Job {job_id} failed: {e}")
+
+async def _run_pipeline_async(job_id: str, path: str) -> None:
+    """``_run_pipeline`` for the asyncio runner; database writes go to the threadpool."""
+    job = await run_in_threadpool(STORE.get, job_id)
+    checkpoints = dict(job.get("checkpoints") or {})
+
+    async def save_checkpoint(stage: str, record: Dict[str, Any]) -> None:
+        checkpoints[stage] = record
+        await run_in_threadpool(STORE.update, job_id, checkpoints=checkpoints)
+
+    async def set_stage(stage: str) -> None:
+        await run_in_threadpool(_set_job, job_id, stage=stage)
+
+    await run_in_threadpool(_set_job, job_id, status="processing")
+    try:
+        out_path = await process_image_async(
+            job_id,
+            path,
+            on_stage=set_stage,
+            input_hash=job.get("sha256"),
+            checkpoints=checkpoints,
+            on_checkpoint=save_checkpoint,
+        )
+        await run_in_threadpool(_set_job, job_id, status="done", processed_path=out_path)
+        JOB_SECONDS.observe(time.time() - _attempt_started(job), status="done")
     except Exception as e:
-        JOBS[job_id]["status"] = "error"
-        JOBS[job_id]["error"] = repr(e)
+        await run_in_threadpool(_set_job, job_id, status="error", error=repr(e))
+        JOB_SECONDS.observe(time.time() - _attempt_started(job), status="error")
         print(f"[ERROR] Job {job_id} failed: {e}")
+
+
+if PIPELINE_RUNNER == "asyncio":
+    SCHEDULER = AsyncPipelineScheduler.from_env(_run_pipeline_async)
+else:
+    SCHEDULER = PipelineScheduler.from_env(_run_pipeline)
+
+Gauge("scan2wall_queue_depth", "Jobs waiting for a pipeline worker.", SCHEDULER.depth)
+Gauge("scan2wall_queue_depth_by_priority", "Jobs waiting for a pipeline worker, per priority class.",
+      SCHEDULER.depth_by_priority, labelname="priority")
+Gauge("scan2wall_jobs_in_flight", "Jobs currently running in the pipeline.", SCHEDULER.in_flight)
+Gauge("scan2wall_stage_slots_in_use", "Stage slots currently held.", STAGE_LIMITS.in_use, labelname="stage")
+Counter("scan2wall_properties_cache_events", "Gemini result cache hits, misses and evictions.",
+      lambda: open_property_cache().stats(), labelname="result")
+Counter("scan2wall_gemini_calls", "Gemini requests, hedges, retries, invalid answers and deadline misses.",
+      gemini_call_stats, labelname="event")
@@ -0,0 +1,149 @@
+"""Content-addressed store for pipeline stage artifacts.
+
+Every stage output (GLB, property JSON, USD, MP4) is filed under a key derived
+from the hash of the uploaded image plus that stage's parameters, so repeat
+uploads of the same photo reuse earlier results instead of regenerating them.
+Files are hard-linked into and out of the store when possible, so a hit costs
+a link rather than a copy.
+
+``prune`` keeps the store bounded: entries unused for ``ARTIFACT_CACHE_MAX_AGE_DAYS``
+go first, then the least recently used ones until the store is under
+``ARTIFACT_CACHE_MAX_GB``. A file still hard-linked into a job's outputs
+counts at full size, although removing it from the store frees nothing
+until the job's copy is gone too.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+CACHE_DIR = Path(os.getenv("ARTIFACT_CACHE_DIR", str(Path(__file__).resolve().parent / "artifacts")))
+CACHE_ENABLED = os.getenv("ARTIFACT_CACHE", "1") != "0"
+CACHE_MAX_BYTES = int(float(os.getenv("ARTIFACT_CACHE_MAX_GB", "20")) * 1024 ** 3)
+CACHE_MAX_AGE_S = float(os.getenv("ARTIFACT_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key for a stage: hash of its inputs and parameters."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """Place *src* at *dest* atomically, hard-linking when on the same filesystem."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+
+class ArtifactCache:
+    """Files and JSON records addressed by ``cache_key`` values."""
+
+    def __init__(
+        self,
+        root: Path = CACHE_DIR,
+        enabled: bool = CACHE_ENABLED,
+        max_bytes: int = CACHE_MAX_BYTES,
+        max_age_s: float = CACHE_MAX_AGE_S,
+    ):
+        self.root = Path(root)
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+
+    def _path(self, key: str, name: str) -> Path:
+        return self.root / key[:2] / key / name
+
+    def get_file(self, key: str, name: str) -> Optional[Path]:
+        if not self.enabled:
+            return None
+        path = self._path(key, name)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path.parent)  # the entry's mtime is its last use, for prune()
+        except OSError:
+            pass
+        return path
+
+    def put_file(self, key: str, name: str, src: Path) -> None:
+        if self.enabled:
+            _link_or_copy(Path(src), self._path(key, name))
+
+    def fetch_file(self, key: str, name: str, dest: Path) -> bool:
+        """Materialize a cached file at *dest*; return False on a miss."""
+        cached = self.get_file(key, name)
+        if cached is None:
+            return False
+        try:
+            _link_or_copy(cached, Path(dest))
+        except FileNotFoundError:  # pruned in the meantime
+            return False
+        return True
+
+    def get_json(self, key: str, name: str) -> Optional[Any]:
+        path = self.get_file(key, name)
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put_json(self, key: str, name: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_text(json.dumps(value))
+        os.replace(tmp, path)
+
+    def prune(self) -> int:
+        """Drop entries unused for ``max_age_s``, then least recently used ones until under ``max_bytes``.
+
+        Returns the number of entries removed. Safe to run while jobs read the
+        store: a hit on an entry removed meanwhile is treated as a miss.
+        """
+        if not self.enabled or not self.root.is_dir():
+            return 0
+        entries = []
+        for shard in self.root.iterdir():
+            if not shard.is_dir():
+                continue
+            for entry in shard.iterdir():
+                try:
+                    used = entry.stat().st_mtime
+                    size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+                except OSError:
+                    continue
+                entries.append((used, size, entry))
+        entries.sort(key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age_s
+        removed = 0
+        for used, size, entry in entries:
+            if used >= cutoff and total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,61 @@
+"""Async subprocess management for the asyncio pipeline runner.
+
+``run_command`` replaces ``Popen(...).wait()`` plus a blocking read loop: the
+child gets its own process group, its output is echoed line by line as it
+arrives, and on timeout or task cancellation the whole group is terminated
+so no orphaned Isaac Sim process keeps holding the GPU.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import signal
+from typing import Optional
+
+KILL_GRACE_S = 5.0
+# Isaac Sim can print very long lines; the asyncio default limit is 64 KiB.
+LINE_LIMIT = 1024 * 1024
+
+
+async def run_command(cmd: str, timeout: Optional[float] = None, label: str = "", echo: bool = True) -> int:
+    """Run *cmd* through ``bash -lic`` and return its exit code.
+
+    Raises ``TimeoutError`` after *timeout* seconds; cancelling the awaiting
+    task also stops the process group.
+    """
+    pipe = asyncio.subprocess.PIPE if echo else asyncio.subprocess.DEVNULL
+    proc = await asyncio.create_subprocess_exec(
+        "/bin/bash", "-lic", cmd,
+        stdout=pipe,
+        stderr=asyncio.subprocess.STDOUT if echo else asyncio.subprocess.DEVNULL,
+        start_new_session=True,  # own process group, so it can be stopped as a whole
+        limit=LINE_LIMIT,
+    )
+    prefix = f"[{label}] " if label else ""
+    try:
+        async with asyncio.timeout(timeout):
+            if proc.stdout is not None:
+                async for line in proc.stdout:
+                    print(prefix + line.decode("utf-8", errors="replace"), end="")
+            return await proc.wait()
+    except TimeoutError:
+        await _terminate(proc)
+        raise TimeoutError(f"{label or 'command'} did not finish within {timeout}s") from None
+    except asyncio.CancelledError:
+        await _terminate(proc)
+        raise
+
+
+async def _terminate(proc: asyncio.subprocess.Process) -> None:
+    """SIGTERM the process group, then SIGKILL it if it is still alive after a grace period."""
+    if proc.returncode is not None:
+        return
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_S)
+    except asyncio.TimeoutError:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(proc.pid, signal.SIGKILL)
+        await proc.wait()
@@ -0,0 +1,57 @@
+"""In-process publish/subscribe for job status updates.
+
+Pipeline workers run on plain threads, while Server-Sent Events subscribers
+live on the asyncio event loop; ``publish`` hands each event over with
+``call_soon_threadsafe`` so workers never block on slow clients.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class JobEvents:
+    """Fan-out of per-job events to any number of asyncio subscribers."""
+
+    def __init__(self, max_buffer: int = 100):
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._subs: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    @contextmanager
+    def subscribe(self, job_id: str) -> Iterator[asyncio.Queue]:
+        """Register a queue that receives every event published for *job_id*.
+
+        Must be entered from a running event loop.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.max_buffer))
+        with self._lock:
+            self._subs.setdefault(job_id, []).append(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subs = self._subs.get(job_id, [])
+                if entry in subs:
+                    subs.remove(entry)
+                if not subs:
+                    self._subs.pop(job_id, None)
+
+    def publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        """Deliver *event* to every subscriber of *job_id*; callable from any thread."""
+        with self._lock:
+            subs = list(self._subs.get(job_id, ()))
+        for loop, queue in subs:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:  # loop already closed during shutdown
+                pass
+
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    # A subscriber that stopped reading only loses its oldest updates.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
@@ -0,0 +1,105 @@
+"""Shared HTTP client for pipeline backends.
+
+The pipeline posts to the mesh server with ``apost_to_file``: one
+``httpx.AsyncClient`` for the whole process caps how many connections are
+open per host and retries connection failures with backoff. Responses are
+streamed to disk rather than buffered.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Optional, Tuple, TypeVar
+
+import httpx
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "4"))
+HTTP_CONNECT_RETRIES = int(os.getenv("HTTP_CONNECT_RETRIES", "3"))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+T = TypeVar("T")
+
+# An httpx.AsyncClient belongs to the event loop it is used on, and the thread
+# runner gives every job a loop of its own. So the client lives on a loop of
+# its own too, and every caller's requests are run there: keep-alive
+# connections outlive jobs and HTTP_POOL_SIZE bounds the whole process.
+_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_CLIENT: Optional[httpx.AsyncClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _serve(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        loop.close()
+
+
+def _client() -> Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]:
+    """The shared client and its loop, started on first use."""
+    global _CLIENT_LOOP, _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT_LOOP is None:
+            limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+            # httpx transport retries cover connection failures only, with exponential backoff.
+            transport = httpx.AsyncHTTPTransport(retries=HTTP_CONNECT_RETRIES, limits=limits)
+            _CLIENT = httpx.AsyncClient(transport=transport, limits=limits)
+            _CLIENT_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_serve, args=(_CLIENT_LOOP,), name="http-client", daemon=True).start()
+        return _CLIENT_LOOP, _CLIENT
+
+
+async def _on_client_loop(coro: Awaitable[T], loop: asyncio.AbstractEventLoop) -> T:
+    # Cancelling the caller cancels the request on the client's loop as well.
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def aclose_async_client() -> None:
+    """Close the shared client and stop its loop; the next request starts a new one."""
+    global _CLIENT_LOOP, _CLIENT
+    with _CLIENT_LOCK:
+        loop, client = _CLIENT_LOOP, _CLIENT
+        _CLIENT_LOOP = _CLIENT = None
+    if loop is not None:
+        try:
+            await _on_client_loop(client.aclose(), loop)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+async def apost_to_file(
+    url: str, dest: Path, timeout: Tuple[float, float] = (10.0, 600.0), **kwargs: Any
+) -> int:
+    """POST to *url* and stream the response body into *dest*; return bytes written.
+
+    The body lands in a temporary sibling first, so *dest* never holds a
+    partial download. *timeout* is ``(connect, read)`` seconds, as with ``requests``. Runs on
+    the shared client's loop whichever loop it is awaited from.
+    """
+    loop, client = _client()
+    return await _on_client_loop(_post_to_file(client, url, Path(dest), timeout, **kwargs), loop)
+
+
+async def _post_to_file(
+    client: httpx.AsyncClient, url: str, dest: Path, timeout: Tuple[float, float], **kwargs: Any
+) -> int:
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.part")
+    written = 0
+    connect, read = timeout
+    timeout = httpx.Timeout(read, connect=connect)
+    async with client.stream("POST", url, timeout=timeout, **kwargs) as resp:
+        resp.raise_for_status()
+        try:
+            with tmp.open("wb") as f:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return written
@@ -0,0 +1,282 @@
+"""Streaming ingestion of uploaded images.
+
+``ingest_form`` parses a ``multipart/form-data`` body as it arrives from the
+client and writes each file part straight to its final location while the
+content hash is computed, so an upload is neither held in memory nor spooled
+to a temporary file first. The size cap applies while bytes arrive, with or
+without a ``Content-Length`` header. The image signature is sniffed from the
+first bytes, and Pillow then checks the file on disk instead of a ``BytesIO``
+copy.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import imghdr
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import python_multipart as multipart  # python-multipart >= 0.0.13
+except ImportError:
+    import multipart
+
+ALLOWED_KINDS = {"jpeg", "png", "webp", "gif"}
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+# Enough for imghdr to recognise every allowed format.
+SNIFF_BYTES = 512
+# Plain (non-file) form fields are short: a priority class, a name.
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class IngestError(Exception):
+    """An upload was rejected; carries the HTTP status and user-facing message."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class IngestedImage:
+    path: Path
+    size: int
+    sha256: str
+    kind: str
+
+
+@dataclass
+class IngestedForm:
+    fields: Dict[str, str] = field(default_factory=dict)
+    images: List[Tuple[str, IngestedImage]] = field(default_factory=list)  # (stored name, image)
+    rejected: List[Tuple[str, IngestError]] = field(default_factory=list)  # (uploaded name, reason)
+
+
+class ImageWriter:
+    """Writes one uploaded image to *dest* chunk by chunk, validating and hashing it on the way.
+
+    ``write`` each chunk, then ``close`` for the result. ``close`` is
+    blocking (Pillow reads the file back). On any rejection the partial file
+    is removed and ``IngestError`` is raised.
+    """
+
+    def __init__(self, dest: Path, display_name: str, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.dest = dest
+        self.display_name = display_name
+        self.max_bytes = max_bytes
+        self.kind: Optional[str] = None
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._head = b""
+        self._out = dest.open("wb")
+
+    def write(self, chunk: bytes) -> None:
+        try:
+            if self.kind is None:
+                self._head += chunk[:SNIFF_BYTES - len(self._head)]
+                if len(self._head) >= SNIFF_BYTES:
+                    self._sniff()
+            self._size += len(chunk)
+            if self._size > self.max_bytes:
+                raise IngestError(
+                    413, f"🚫 '{self.display_name}' is larger than {self.max_bytes // (1024 * 1024)} MB."
+                )
+            self._digest.update(chunk)
+            self._out.write(chunk)
+        except BaseException:
+            self.abort()
+            raise
+
+    def _sniff(self) -> None:
+        kind = imghdr.what(None, self._head)
+        if kind not in ALLOWED_KINDS:
+            raise IngestError(
+                400, f"🚫 '{self.display_name}' is not a valid image. Supported: JPEG, PNG, WEBP, GIF."
+            )
+        self.kind = kind
+
+    def close(self) -> IngestedImage:
+        try:
+            if self.kind is None:  # shorter than SNIFF_BYTES
+                self._sniff()
+            self._out.close()
+            # Header/structure check straight from disk; Pillow reads lazily.
+            try:
+                with Image.open(self.dest) as img:
+                    img.verify()
+            except Exception:
+                raise IngestError(
+                    400, f"⚠️ '{self.display_name}' appears corrupted or unreadable. Try again with a valid image."
+                )
+        except BaseException:
+            self.abort()
+            raise
+        return IngestedImage(path=self.dest, size=self._size, sha256=self._digest.hexdigest(), kind=self.kind)
+
+    def abort(self) -> None:
+        self._out.close()
+        self.dest.unlink(missing_ok=True)
+
+
+class _FormReader:
+    """python-multipart callbacks: fields are collected, file parts go through an ``ImageWriter``."""
+
+    def __init__(self, dest_dir: Path, name_for: Callable[[str], str], max_files: int, max_bytes: int,
+                 before_file: Optional[Callable[[Dict[str, str], int], None]]):
+        self.dest_dir = dest_dir
+        self.name_for = name_for
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.before_file = before_file
+        self.form = IngestedForm()
+        self.files: List[Tuple[str, str, ImageWriter]] = []  # complete parts, not yet verified
+        self.ended = False
+        self._files = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._field: Optional[str] = None
+        self._value = bytearray()
+        self._upload: Optional[Tuple[str, str]] = None  # (stored name, uploaded name)
+        self._writer: Optional[ImageWriter] = None
+
+    def callbacks(self) -> Dict[str, Callable]:
+        return {
+            "on_part_begin": self._reset,
+            "on_header_field": lambda data, start, end: self._add_header_field(data[start:end]),
+            "on_header_value": lambda data, start, end: self._add_header_value(data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": lambda data, start, end: self._part_data(data[start:end]),
+            "on_part_end": self._part_end,
+            "on_end": self._end,
+        }
+
+    def _add_header_field(self, data: bytes) -> None:
+        self._header_field += data
+
+    def _add_header_value(self, data: bytes) -> None:
+        self._header_value += data
+
+    def _header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field, self._header_value = b"", b""
+
+    def _headers_finished(self) -> None:
+        _, options = multipart.multipart.parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" not in options:
+            self._field = name
+            return
+        self._files += 1
+        if self._files > self.max_files:
+            raise IngestError(400, f"🚫 Too many files: at most {self.max_files} per upload.")
+        if self.before_file is not None:
+            self.before_file(self.form.fields, self._files)
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        stored = self.name_for(filename)
+        self._upload = (stored, filename)
+        self._writer = ImageWriter(self.dest_dir / stored, filename, self.max_bytes)
+
+    def _part_data(self, data: bytes) -> None:
+        if self._writer is not None:
+            try:
+                self._writer.write(data)
+            except IngestError as e:
+                # Only this file is rejected; the rest of its part is discarded.
+                self.form.rejected.append((self._upload[1], e))
+                self._writer = None
+        elif self._field is not None:
+            self._value += data
+            if len(self._value) > MAX_FIELD_BYTES:
+                raise IngestError(400, f"🚫 Form field '{self._field}' is too large.")
+
+    def _part_end(self) -> None:
+        if self._writer is not None:
+            self.files.append((*self._upload, self._writer))
+        elif self._field is not None:
+            self.form.fields[self._field] = self._value.decode("utf-8", errors="replace")
+        self._reset()
+
+    def _end(self) -> None:
+        self.ended = True
+
+    def abort(self) -> None:
+        """Remove every file written so far."""
+        if self._writer is not None:
+            self._writer.abort()
+        for _, _, writer in self.files:
+            writer.abort()
+        for _, image in self.form.images:
+            image.path.unlink(missing_ok=True)
+
+
+async def ingest_form(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    dest_dir: Path,
+    name_for: Callable[[str], str],
+    max_files: int = 1,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    max_total_bytes: Optional[int] = None,
+    before_file: Optional[Callable[[Dict[str, str], int], None]] = None,
+) -> IngestedForm:
+    """Parse a ``multipart/form-data`` body from *chunks* as it arrives.
+
+    Each file part is written to ``dest_dir / name_for(uploaded_name)`` through
+    an ``ImageWriter``; a file that fails validation lands in ``rejected``
+    and the others are kept. *before_file* is called with the fields seen so
+    far and the 1-based file number as each file part starts, and may raise
+    to refuse the upload before its bytes are stored.
+
+    Raises ``IngestError`` for a body that is not multipart, is cut short,
+    has more than *max_files* files or exceeds *max_total_bytes*; every file
+    written so far is removed when anything is raised.
+    """
+    ctype, params = multipart.multipart.parse_options_header(content_type)
+    if ctype != b"multipart/form-data" or not params.get(b"boundary"):
+        raise IngestError(400, "🚫 Expected a multipart/form-data upload.")
+    reader = _FormReader(dest_dir, name_for, max_files, max_bytes, before_file)
+    parser = multipart.MultipartParser(params[b"boundary"], reader.callbacks())
+    try:
+        total = 0
+        buffer = bytearray()
+        async for chunk in chunks:
+            total += len(chunk)
+            if max_total_bytes is not None and total > max_total_bytes:
+                raise IngestError(413, f"🚫 Upload is larger than {max_total_bytes // (1024 * 1024)} MB.")
+            buffer += chunk
+            if len(buffer) >= CHUNK_SIZE:
+                # Parsing, hashing and file writes happen off the event loop, a chunk at a time.
+                await asyncio.to_thread(parser.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(parser.write, bytes(buffer))
+        parser.finalize()
+        if not reader.ended:
+            raise IngestError(400, "🚫 The upload was cut short.")
+
+        results = await asyncio.gather(
+            *(asyncio.to_thread(writer.close) for _, _, writer in reader.files), return_exceptions=True
+        )
+        for (stored, uploaded, _), result in zip(reader.files, results):
+            if isinstance(result, IngestError):
+                reader.form.rejected.append((uploaded, result))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                reader.form.images.append((stored, result))
+        reader.files = []
+    except BaseException:
+        reader.abort()
+        raise
+    return reader.form
@@ -0,0 +1,57 @@
+"""Client for resident Isaac Sim helper processes.
+
+The scripts in ``isaac_scripts/`` can stay alive with ``--serve ADDRESS`` and
+accept one JSON-line request per connection. ADDRESS is either ``HOST:PORT``
+or an absolute Unix socket path. ``acall_worker`` sends one request over
+asyncio streams.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from typing import Any, Dict, Optional
+
+
+class WorkerUnavailable(Exception):
+    """The resident worker could not be reached; callers fall back to a subprocess."""
+
+
+class WorkerError(Exception):
+    """The resident worker was reached but reported a failure."""
+
+
+async def acall_worker(
+    address: str,
+    request: Dict[str, Any],
+    timeout: Optional[float] = 600.0,
+    connect_timeout: float = 2.0,
+) -> Dict[str, Any]:
+    """Send *request* to the worker at *address* without blocking the event loop."""
+    try:
+        if address.startswith("/"):
+            opening = asyncio.open_unix_connection(address)
+        else:
+            host, port = address.rsplit(":", 1)
+            opening = asyncio.open_connection(host, int(port))
+        reader, writer = await asyncio.wait_for(opening, connect_timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise WorkerUnavailable(f"{address}: {e!r}") from e
+    try:
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+    finally:
+        writer.close()
+        with contextlib.suppress(OSError):
+            await writer.wait_closed()
+    return _parse_reply(address, line.decode("utf-8"))
+
+
+def _parse_reply(address: str, line: str) -> Dict[str, Any]:
+    if not line:
+        raise WorkerError(f"{address} closed the connection without replying")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise WorkerError(reply.get("error", "unknown worker error"))
+    return reply
@@ -0,0 +1,262 @@
+"""Persistent job storage for the upload server.
+
+Jobs used to live in a module-level dict, which lost all state on restart and
+grew without bound. ``JobStore`` is the interface the server talks to;
+``SqliteJobStore`` is the default backend (WAL mode, indexed on status and
+created_at, finished jobs moved to an archive table after a retention period).
+"""
+from __future__ import annotations
+
+import base64
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from scan2wall.sqlite_local import LocalConnection
+
+ACTIVE_STATUSES = ("queued", "processing")
+FINISHED_STATUSES = ("done", "error")
+
+# Columns stored natively; anything else on a job dict goes into ``extra`` (JSON).
+_COLUMNS = (
+    "id",
+    "filename",
+    "path",
+    "status",
+    "created_at",
+    "updated_at",
+    "processed_path",
+    "error",
+    "batch_id",
+)
+
+
+class JobStore(ABC):
+    """Interface for job persistence backends."""
+
+    @abstractmethod
+    def create(self, job: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        ...
+
+    @abstractmethod
+    def list(
+        self,
+        limit: int = 100,
+        statuses: Optional[Sequence[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Page through jobs, newest first.
+
+        Returns the page and an opaque cursor for the next one (None at the end).
+        *fields* restricts each returned dict to those keys.
+        """
+
+    @abstractmethod
+    def batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        """All jobs (live or archived) belonging to *batch_id*, oldest first."""
+
+    @abstractmethod
+    def prune(self, max_age: float) -> int:
+        """Archive finished jobs older than *max_age* seconds; return how many moved."""
+
+    @abstractmethod
+    def fail_interrupted(self, reason: str) -> int:
+        """Mark jobs left queued/processing by a previous process as failed."""
+
+
+class SqliteJobStore(JobStore):
+    """SQLite-backed job store. Safe to share between the event loop and worker threads."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = LocalConnection(self.db_path)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        columns = ", ".join(
+            f"{c} TEXT PRIMARY KEY" if c == "id" else f"{c} {'REAL' if c.endswith('_at') else 'TEXT'}"
+            for c in _COLUMNS
+        )
+        conn = self._conn()
+        for table in ("jobs", "jobs_archive"):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns}, extra TEXT)")
+            # Columns added after a database was created are appended to both
+            # tables alike, so archive copies with SELECT * stay aligned.
+            existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            for c in _COLUMNS:
+                if c not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {c} {'REAL' if c.endswith('_at') else 'TEXT'}")
+        conn.execute("DROP INDEX IF EXISTS idx_jobs_status")
+        conn.execute("DROP INDEX IF EXISTS idx_jobs_created")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_id ON jobs (created_at, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_archive_batch ON jobs_archive (batch_id)")
+
+    @staticmethod
+    def _split(job: Dict[str, Any]) -> Dict[str, Any]:
+        row = {c: job.get(c) for c in _COLUMNS}
+        extra = {k: v for k, v in job.items() if k not in _COLUMNS}
+        row["extra"] = json.dumps(extra) if extra else None
+        return row
+
+    @staticmethod
+    def _join(row: sqlite3.Row) -> Dict[str, Any]:
+        job = {c: row[c] for c in _COLUMNS}
+        if row["extra"]:
+            job.update(json.loads(row["extra"]))
+        return job
+
+    def create(self, job: Dict[str, Any]) -> None:
+        job = {**job, "updated_at": job.get("updated_at") or time.time()}
+        row = self._split(job)
+        names = ", ".join(row)
+        marks = ", ".join(f":{k}" for k in row)
+        self._conn().execute(f"INSERT INTO jobs ({names}) VALUES ({marks})", row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            row = self._conn().execute("SELECT * FROM jobs_archive WHERE id = ?", (job_id,)).fetchone()
+        return self._join(row) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        native = {k: v for k, v in fields.items() if k in _COLUMNS}
+        extra = {k: v for k, v in fields.items() if k not in _COLUMNS}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if extra:
+                row = conn.execute("SELECT extra FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    raise KeyError(job_id)
+                merged = json.loads(row["extra"]) if row["extra"] else {}
+                merged.update(extra)
+                native["extra"] = json.dumps(merged)
+            assignments = ", ".join(f"{k} = :{k}" for k in native)
+            cur = conn.execute(f"UPDATE jobs SET {assignments} WHERE id = :_id", {**native, "_id": job_id})
+            if cur.rowcount == 0:
+                raise KeyError(job_id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list(
+        self,
+        limit: int = 100,
+        statuses: Optional[Sequence[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        where, params = [], []
+        if statuses:
+            where.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            # Keyset pagination: continue strictly after the last row served.
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(_decode_cursor(cursor))
+
+        if fields is None:
+            columns = "*"
+        else:
+            wanted = {"id", "created_at"} | {f for f in fields if f in _COLUMNS}
+            if any(f not in _COLUMNS for f in fields):
+                wanted.add("extra")
+            columns = ", ".join(sorted(wanted))
+
+        sql = f"SELECT {columns} FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, (*params, int(limit) + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        jobs = []
+        for row in rows:
+            job = {k: row[k] for k in row.keys() if k != "extra"}
+            if "extra" in row.keys() and row["extra"]:
+                job.update(json.loads(row["extra"]))
+            if fields is not None:
+                job = {f: job.get(f) for f in fields}
+            jobs.append(job)
+        return jobs, next_cursor
+
+    def batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE batch_id = ? "
+            "UNION ALL SELECT * FROM jobs_archive WHERE batch_id = ? "
+            "ORDER BY created_at, id",
+            (batch_id, batch_id),
+        ).fetchall()
+        return [self._join(r) for r in rows]
+
+    def prune(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        marks = ", ".join("?" for _ in FINISHED_STATUSES)
+        where = f"status IN ({marks}) AND updated_at < ?"
+        params = (*FINISHED_STATUSES, cutoff)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"INSERT OR REPLACE INTO jobs_archive SELECT * FROM jobs WHERE {where}", params)
+            moved = conn.execute(f"DELETE FROM jobs WHERE {where}", params).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return moved
+
+    def fail_interrupted(self, reason: str) -> int:
+        marks = ", ".join("?" for _ in ACTIVE_STATUSES)
+        cur = self._conn().execute(
+            f"UPDATE jobs SET status = 'error', error = ?, updated_at = ? WHERE status IN ({marks})",
+            (reason, time.time(), *ACTIVE_STATUSES),
+        )
+        return cur.rowcount
+
+
+def _encode_cursor(created_at: float, job_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, job_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(created_at), str(job_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def open_job_store(db_path: Path) -> JobStore:
+    """Open the configured job store backend."""
+    return SqliteJobStore(db_path)
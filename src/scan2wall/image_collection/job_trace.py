@@ -0,0 +1,218 @@
+"""Structured per-job trace log.
+
+Every pipeline run appends one JSON line to ``JOB_TRACE_PATH``: the start and
+end time of each stage, whether it came from a checkpoint or the artifact
+cache, subprocess exit codes, artifact sizes, mesh face/vertex counts and
+the Gemini latency. Code running inside a stage adds fields with ``record``;
+the active trace is found through a context variable, so helpers such as
+``convert_mesh`` need no extra parameters.
+
+Summarize a window of traces with::
+
+    python job_trace.py --since 24h
+"""
+from __future__ import annotations
+
+import argparse
+import contextvars
+import fcntl
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+JOB_TRACE_PATH = Path(os.getenv("JOB_TRACE_PATH", str(Path(__file__).resolve().parent / "job_traces.jsonl")))
+
+_CURRENT: contextvars.ContextVar[Optional["JobTrace"]] = contextvars.ContextVar("job_trace", default=None)
+_WRITE_LOCK = threading.Lock()
+
+
+class JobTrace:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.fields: Dict[str, Any] = {}
+        self._open: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Time the block as stage *name*; ``record`` calls inside it land on this stage."""
+        entry = self.stages.setdefault(name, {})
+        entry["start"] = time.time()
+        previous, self._open = self._open, name
+        try:
+            yield entry
+            entry["status"] = "ok"
+        except BaseException as e:
+            entry["status"] = "error"
+            entry["error"] = repr(e)
+            raise
+        finally:
+            self._open = previous
+            entry["end"] = time.time()
+            entry["seconds"] = round(entry["end"] - entry["start"], 4)
+
+    def record(self, stage: Optional[str] = None, **fields: Any) -> None:
+        """Attach *fields* to *stage* (default: the open stage, else the job itself)."""
+        stage = stage or self._open
+        target = self.stages.setdefault(stage, {}) if stage else self.fields
+        target.update(fields)
+
+    def to_dict(self, status: str, error: Optional[str] = None) -> Dict[str, Any]:
+        finished_at = time.time()
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "seconds": round(finished_at - self.started_at, 4),
+            "status": status,
+            "error": error,
+            **self.fields,
+            "stages": self.stages,
+        }
+
+    def write(self, status: str, error: Optional[str] = None, path: Path = JOB_TRACE_PATH) -> None:
+        line = json.dumps(self.to_dict(status, error), default=str) + "\n"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with _WRITE_LOCK, open(path, "a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)  # other server processes append to the same file
+                f.write(line)
+        except OSError as e:
+            print(f"[WARN] Could not write job trace for {self.job_id}: {e}")
+
+
+@contextmanager
+def tracing(job_id: str) -> Iterator[JobTrace]:
+    """Make a new trace current for the block and write it when the block ends."""
+    trace = JobTrace(job_id)
+    token = _CURRENT.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.write("error", repr(e))
+        raise
+    else:
+        trace.write("done")
+    finally:
+        _CURRENT.reset(token)
+
+
+def record(stage: Optional[str] = None, **fields: Any) -> None:
+    """Attach *fields* to *stage* (default: the open stage) of the current job; a no-op outside a traced job."""
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.record(stage, **fields)
+
+
+def glb_stats(path: Path) -> Dict[str, int]:
+    """Vertex and triangle counts of a binary glTF, read from its JSON chunk only."""
+    with open(path, "rb") as f:
+        magic, _, _ = struct.unpack("<4sII", f.read(12))
+        chunk_len, chunk_type = struct.unpack("<I4s", f.read(8))
+        if magic != b"glTF" or chunk_type != b"JSON":
+            raise ValueError(f"{path} is not a binary glTF file")
+        gltf = json.loads(f.read(chunk_len))
+    accessors = gltf.get("accessors", [])
+    vertices = faces = 0
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            count = accessors[prim["attributes"]["POSITION"]]["count"]
+            vertices += count
+            if prim.get("mode", 4) == 4:  # triangles
+                indexed = prim.get("indices")
+                faces += (accessors[indexed]["count"] if indexed is not None else count) // 3
+    return {"vertices": vertices, "faces": faces}
+
+
+# ---------------------------------------------------------------------------
+# Summary CLI
+# ---------------------------------------------------------------------------
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _parse_time(value: str) -> float:
+    """Epoch seconds, or a look-back like ``30m``, ``24h``, ``7d``."""
+    if value[-1:] in _UNITS:
+        return time.time() - float(value[:-1]) * _UNITS[value[-1]]
+    return float(value)
+
+
+def load_traces(path: Path, since: Optional[float] = None, until: Optional[float] = None) -> List[Dict[str, Any]]:
+    traces = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                trace = json.loads(line)
+            except ValueError:
+                continue
+            started = trace.get("started_at", 0)
+            if (since is None or started >= since) and (until is None or started < until):
+                traces.append(trace)
+    return traces
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of non-empty *values*."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(traces: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-stage latency percentiles of stages that actually ran (not cached or resumed)."""
+    series: Dict[str, List[float]] = {}
+    for trace in traces:
+        for name, stage in trace.get("stages", {}).items():
+            if "seconds" in stage and not stage.get("cached") and not stage.get("resumed"):
+                series.setdefault(name, []).append(stage["seconds"])
+        gemini = trace.get("stages", {}).get("properties", {}).get("gemini_s")
+        if gemini is not None:
+            series.setdefault("gemini", []).append(gemini)
+        series.setdefault("total", []).append(trace["seconds"])
+    return {
+        name: {
+            "n": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+        for name, values in series.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize per-stage latency from job traces.")
+    parser.add_argument("--path", type=Path, default=JOB_TRACE_PATH)
+    parser.add_argument("--since", type=_parse_time, default=None, help="epoch seconds or look-back (30m, 24h, 7d)")
+    parser.add_argument("--until", type=_parse_time, default=None, help="epoch seconds or look-back")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.path.exists():
+        print(f"No trace file at {args.path}", file=sys.stderr)
+        return 1
+    traces = load_traces(args.path, args.since, args.until)
+    summary = summarize(traces)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    failed = sum(1 for t in traces if t.get("status") != "done")
+    print(f"{len(traces)} jobs ({failed} failed)")
+    print(f"{'stage':<12}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, s in summary.items():
+        print(f"{name:<12}{s['n']:>6}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
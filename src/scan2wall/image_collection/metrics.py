@@ -0,0 +1,127 @@
+"""Minimal Prometheus metrics for the upload server.
+
+Only histograms and callback-based gauges and counters are needed, so this
+renders the text exposition format directly instead of pulling in
+``prometheus_client``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; spans a fast cache hit up to a slow mesh generation.
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+REGISTRY: List["Histogram | Gauge | Counter"] = []
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall-clock duration of the block, even if it raises."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                le = _labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {count:g}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {values[-1]:g}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {values[-2]:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {values[-1]:g}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from *fn* at scrape time.
+
+    *fn* returns a number, or a dict mapping a single label's values to numbers.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], "float | Dict[str, float]"], labelname: str = ""):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelname = labelname
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        value = self.fn()
+        if isinstance(value, dict):
+            for label, v in sorted(value.items()):
+                lines.append(f"{self.name}{_labels((self.labelname,), (label,))} {v:g}")
+        else:
+            lines.append(f"{self.name} {value:g}")
+        return lines
+
+
+class Counter(Gauge):
+    """Counter whose running total is read from *fn* at scrape time, exported as ``<name>_total``."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], "float | Dict[str, float]"], labelname: str = ""):
+        super().__init__(name if name.endswith("_total") else name + "_total", help, fn, labelname)
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "scan2wall_stage_duration_seconds",
+    "Time spent in each pipeline stage.",
+    labelnames=("stage",),
+)
+UPLOAD_VALIDATION_SECONDS = Histogram(
+    "scan2wall_upload_validation_seconds",
+    "Time to stream, hash and validate an uploaded image.",
+)
+JOB_SECONDS = Histogram(
+    "scan2wall_job_duration_seconds",
+    "End-to-end job time from upload (or retry) to completion.",
+    labelnames=("status",),
+)
@@ -1,54 +1,539 @@
 from pathlib import Path
 import cv2
 import numpy as np
-from scan2wall.material_properties.get_object_properties import get_object_properties
-import requests
+from scan2wall.material_properties.get_object_properties import (
+    GEMINI_BATCH_SIZE,
+    MODEL_NAME as PROPERTIES_MODEL,
+    PROMPT_VERSION,
+    get_object_properties,
+    get_object_properties_batch,
+)
+from scan2wall.material_properties.preprocess import preprocess_params
+from scan2wall.material_properties.offline_estimator import estimate_from_mesh
+from scan2wall.asset_catalog import Asset, open_catalog
+from artifact_cache import ArtifactCache, cache_key, file_sha256
+from normalize import NORMALIZE_FORMAT, NORMALIZE_LONG_EDGE, NORMALIZE_QUALITY, normalize_image
+from scheduler import FairExecutor, StageLimiter, async_stage_slot, current_priority, weights_from_env
+from metrics import STAGE_SECONDS
+from http_client import apost_to_file
+from isaac_client import WorkerUnavailable, acall_worker
+from commands import run_command
+from recording_ids import RECORDING_COUNTER_PATH, RecordingIds
+import job_trace
 import re
-import subprocess
 import os
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-USE_LLM = True
+# "gemini": properties from the LLM. "offline": from the generated mesh and the
+# bundled material table, no API key or network needed. "auto": Gemini, with
+# the offline estimate when it fails or takes longer than PROPERTIES_TIMEOUT_S.
+PROPERTIES_ESTIMATOR = os.getenv("PROPERTIES_ESTIMATOR", "gemini")
+PROPERTIES_TIMEOUT_S = float(os.getenv("PROPERTIES_TIMEOUT_S", "60"))
+USE_LLM = PROPERTIES_ESTIMATOR != "offline"
+OFFLINE_FALLBACK = PROPERTIES_ESTIMATOR in ("offline", "auto")
 USE_SCALING = True
 
+RECORDINGS_DIR = Path("/workspace/scan2wall/recordings")
+RECORDING_IDS = RecordingIds(RECORDING_COUNTER_PATH, RECORDINGS_DIR)
+# Form fields sent to the mesh server; part of the mesh cache key.
+MESH_PARAMS = {"timeout": "300"}
+# Derived-image settings; every stage that reads the image depends on them.
+NORMALIZE_PARAMS = (NORMALIZE_LONG_EDGE, NORMALIZE_FORMAT, NORMALIZE_QUALITY)
+CACHE = ArtifactCache()
 
-def process_image(job_id: str, image_path: str) -> str:
+# Resident converter started with `convert_mesh.py --serve ADDRESS`; unset or
+# unreachable means one Isaac app launch per conversion.
+USD_CONVERTER_ADDRESS = os.getenv("USD_CONVERTER_ADDRESS")
+CONVERSION_TIMEOUT_S = 600.0
+
+# Resident recorders started with `test_place_obj_video.py --video --serve ADDRESS`,
+# comma-separated. Each records one throw at a time; a job takes whichever is
+# free. Empty means one Isaac app launch per recording.
+SIM_WORKER_ADDRESSES = [a.strip() for a in os.getenv("SIM_WORKER_ADDRESSES", "").split(",") if a.strip()]
+SIMULATION_TIMEOUT_S = 900.0
+
+# Fast path: when Gemini recognizes an object type that already has a
+# confidently estimated asset in the catalog, skip mesh generation and USD
+# conversion and throw the cataloged USD, scaled to the new dimensions.
+FAST_PATH = os.getenv("FAST_PATH", "0") == "1" and USE_LLM
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+
+# Image-only stages (normalization, property estimation) run here so they can
+# start at upload time and overlap mesh generation. Waiting estimates are
+# served by priority class, like the pipeline queue and stage slots.
+PREFETCH_POOL = FairExecutor(int(os.getenv("PROPERTIES_WORKERS", "4")), weights_from_env(), name="properties")
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _props_key(input_hash: str) -> str:
+    return cache_key("properties", input_hash, NORMALIZE_PARAMS, PROPERTIES_MODEL, PROMPT_VERSION, preprocess_params())
+
+
+def start_properties(
+    image_path: str, input_hash: Optional[str] = None, priority: Optional[str] = None
+) -> Optional[Future]:
+    """Begin normalization and property estimation for *image_path* in the background.
+
+    *priority* is the job's class (default: the current job's).
+
+    Returns a future resolving to the properties dict, or None when the LLM is
+    disabled. Concurrent calls for the same image share one estimation.
+    """
+    if not USE_LLM:
+        return None
+    p = Path(image_path)
+    input_hash = input_hash or file_sha256(p)
+    props_key = _props_key(input_hash)
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.get(props_key)
+        if future is not None:
+            return future
+        timings: Dict[str, Any] = {}
+        future = PREFETCH_POOL.submit(priority or current_priority(), _estimate_properties, p, props_key, timings)
+        # Filled in by the estimation; the properties stage copies it into the job trace.
+        future.timings = timings
+        _INFLIGHT[props_key] = future
+    # Outside the lock: an already finished future runs the callback right here.
+    future.add_done_callback(lambda f: _forget(props_key, f))
+    return future
+
+
+def start_properties_batch(
+    images: List[Tuple[str, Optional[str]]], priority: Optional[str] = None
+) -> List[Optional[Future]]:
+    """``start_properties`` for several ``(image_path, input_hash)`` pairs.
+
+    Images without a shared estimate yet are estimated ``GEMINI_BATCH_SIZE`` at a time,
+    one Gemini request per group, instead of one request per image.
+    """
+    if not USE_LLM:
+        return [None] * len(images)
+    keyed = []
+    for image_path, input_hash in images:
+        p = Path(image_path)
+        input_hash = input_hash or file_sha256(p)
+        keyed.append((p, _props_key(input_hash)))
+    futures, pending = [], []
+    with _INFLIGHT_LOCK:
+        for p, props_key in keyed:
+            future = _INFLIGHT.get(props_key)
+            if future is None:
+                future = Future()
+                future.timings = {}
+                _INFLIGHT[props_key] = future
+                pending.append((p, props_key, future))
+            futures.append(future)
+    for _, props_key, future in pending:
+        future.add_done_callback(lambda f, k=props_key: _forget(k, f))
+    for start in range(0, len(pending), max(1, GEMINI_BATCH_SIZE)):
+        group = pending[start:start + max(1, GEMINI_BATCH_SIZE)]
+        PREFETCH_POOL.submit(priority or current_priority(), _estimate_properties_batch, group)
+    return futures
+
+
+def _forget(props_key: str, future: Future) -> None:
+    with _INFLIGHT_LOCK:
+        if _INFLIGHT.get(props_key) is future:
+            del _INFLIGHT[props_key]
+
+
+def _estimate_properties(image_path: Path, props_key: str, timings: Dict[str, Any]) -> Dict[str, Any]:
+    # Repeat images are answered from the property cache inside get_object_properties.
+    with STAGE_SECONDS.time(stage="normalize"):
+        norm = normalize_image(image_path)
+    start = time.monotonic()
+    with STAGE_SECONDS.time(stage="properties"):
+        props = get_object_properties(str(norm))
+    timings["gemini_s"] = round(time.monotonic() - start, 4)
+    return props
+
+
+def _estimate_properties_batch(pending: List[Tuple[Path, str, Future]]) -> None:
+    """Resolve the futures of one group from ``start_properties_batch``."""
+    try:
+        todo = []
+        for image_path, props_key, future in pending:
+            with STAGE_SECONDS.time(stage="normalize"):
+                todo.append((normalize_image(image_path), props_key, future))
+        start = time.monotonic()
+
+        def resolve(i: int, props: Dict[str, Any]) -> None:
+            # Each job continues as soon as its own answer is in.
+            future = todo[i][2]
+            future.timings.update(gemini_s=round(time.monotonic() - start, 4), gemini_batch=len(todo))
+            future.set_result(props)
+
+        with STAGE_SECONDS.time(stage="properties"):
+            get_object_properties_batch([str(norm) for norm, _, _ in todo], on_result=resolve)
+    except Exception as e:
+        for _, _, future in pending:
+            if not future.done():
+                future.set_exception(e)
+
+
+# Checkpointed stages, in order. Each stage returns a JSON-serializable record.
+# The checkpoints also hold a "recording" entry: the job's video file name.
+PIPELINE_STAGES = ("mesh", "properties", "conversion", "simulation")
+# With the fast path on, properties must be known before deciding to generate a mesh.
+FAST_PATH_STAGES = ("properties", "mesh", "conversion", "simulation")
+
+
+@dataclass
+class _Run:
+    job_id: str
+    image_path: Path
+    norm: Path
+    input_hash: str
+    out_dir: Path
+    report: Callable[[str], Awaitable[None]]
+    save: Callable[[str, Dict[str, Any]], Awaitable[None]]
+    props_future: Optional[Future] = None
+    fast_asset: Optional[Asset] = None
+
+
+class _SpeculativeMesh:
+    """Mesh generation started while Gemini decides whether the fast path applies.
+
+    Until the job reaches its mesh stage, the stage users see stays
+    "properties". A request the mesh server has received cannot be recalled,
+    so ``abandon`` only cancels one still waiting for its slot; otherwise the
+    mesh finishes (holding its slot) into the artifact cache.
+    """
+
+    def __init__(self, run: _Run, done: Dict[str, Dict[str, Any]]):
+        self.started = time.time()
+        self.posted = False
+        self._run = run
+        self._joined = False
+        self.task = asyncio.create_task(_stage_mesh(replace(run, report=self._report), done))
+
+    async def _report(self, stage: str) -> None:
+        # Called by _stage_mesh right before the request is sent.
+        self.posted = True
+        if self._joined:
+            await self._run.report(stage)
+
+    async def join(self) -> Dict[str, Any]:
+        """The mesh record, for a job that needs the mesh after all."""
+        self._joined = True
+        if self.posted and not self.task.done():
+            await self._run.report("mesh")
+        return await self.task
+
+    def abandon(self) -> None:
+        """The fast path applies: drop the mesh unless the server already has it."""
+        if not self.posted:
+            self.task.cancel()
+
+    async def drain(self) -> None:
+        """Wait for an abandoned mesh that could not be cancelled; its failure does not matter."""
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            if not self.task.cancelled():
+                raise
+        except Exception as e:
+            print(f"[WARN] Job {self._run.job_id}: unused speculative mesh failed: {e}")
+
+    def cancel(self) -> None:
+        if not self.task.cancel() and not self.task.cancelled():
+            self.task.exception()  # retrieved so an unneeded failure is not logged at exit
+
+
+def process_image(
+    job_id: str,
+    image_path: str,
+    on_stage: Optional[Callable[[str], None]] = None,
+    input_hash: Optional[str] = None,
+    checkpoints: Optional[Dict[str, Dict[str, Any]]] = None,
+    on_checkpoint: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> str:
     """
     Args:
         image_path: path to uploaded image
+        on_stage: called with the stage name ("mesh", "properties", "conversion",
+            "simulation") as each stage starts
+        input_hash: SHA-256 of the uploaded bytes, if already known; keys the
+            artifact cache so repeat uploads reuse earlier stage outputs
+        checkpoints: records of stages completed by an earlier attempt; stages
+            whose record is still valid are skipped
+        on_checkpoint: called with (stage, record) as each stage completes, so
+            the caller can persist it
     Returns:
         Path to a processed artifact (e.g., a thumbnail or JSON result)
+
+    Blocking form of ``process_image_async`` for the thread runner: the job
+    runs on an event loop of its own, so both runners share one set of stages.
     """
-    p = Path(image_path)
-    out_dir = p.parent.parent / "processed"
-    out_dir.mkdir(parents=True, exist_ok=True)
+    async def report(stage: str) -> None:
+        if on_stage is not None:
+            on_stage(stage)
+
+    async def save(stage: str, record: Dict[str, Any]) -> None:
+        if on_checkpoint is not None:
+            on_checkpoint(stage, record)
+
+    return asyncio.run(process_image_async(job_id, image_path, report, input_hash, checkpoints, save))
+
+
+async def process_image_async(
+    job_id: str,
+    image_path: str,
+    on_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+    input_hash: Optional[str] = None,
+    checkpoints: Optional[Dict[str, Dict[str, Any]]] = None,
+    on_checkpoint: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+) -> str:
+    """Coroutine version of ``process_image``; *on_stage* and *on_checkpoint* are coroutine functions.
+
+    Waiting on the mesh server, Isaac workers and subprocesses happens on the
+    event loop. Only short file operations (hashing, normalization, cache
+    links) go to threads.
+    """
+    with job_trace.tracing(job_id) as trace:
+        p = Path(image_path)
+        out_dir = p.parent.parent / "processed"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        input_hash = input_hash or await asyncio.to_thread(file_sha256, p)
+        done = _valid_checkpoints(checkpoints)
+
+        async def ignore(*args: Any) -> None:
+            pass
+
+        save = on_checkpoint or ignore
+
+        # Orientation-fixed, downscaled copy shared by every downstream stage.
+        with trace.stage("normalize"), STAGE_SECONDS.time(stage="normalize"):
+            norm = await asyncio.to_thread(normalize_image, p)
+        run = _Run(job_id, p, norm, input_hash, out_dir, on_stage or ignore, save)
+        if "properties" not in done:
+            # Property estimation only needs the image: run it alongside mesh
+            # generation (usually it was already started at upload time).
+            run.props_future = start_properties(image_path, input_hash)
+
+        speculative_mesh = None
+        if FAST_PATH and "mesh" not in done and run.props_future is not None and not run.props_future.done():
+            # Gemini is still answering: generate the mesh meanwhile, in case
+            # the fast path does not apply.
+            speculative_mesh = _SpeculativeMesh(run, done)
+        try:
+            for stage in FAST_PATH_STAGES if FAST_PATH else PIPELINE_STAGES:
+                if stage == "mesh" and FAST_PATH and "conversion" not in done:
+                    run.fast_asset = await asyncio.to_thread(_fast_path_asset, done["properties"])
+                    if run.fast_asset is not None and speculative_mesh is not None:
+                        speculative_mesh.abandon()
+                        trace.record("mesh", speculative="sent" if speculative_mesh.posted else "cancelled")
+                if stage == "conversion" and done["properties"].get("deferred"):
+                    # Gemini failed before the mesh existed; estimate from the mesh now.
+                    with trace.stage("properties"):
+                        done["properties"] = await asyncio.to_thread(_offline_properties, run, done)
+                    await save("properties", done["properties"])
+                if stage in done:
+                    print(f"[RESUME] Job {job_id}: {stage} already complete")
+                    trace.record(stage, resumed=True)
+                    continue
+                with trace.stage(stage) as entry:
+                    if stage == "mesh" and speculative_mesh is not None and run.fast_asset is None:
+                        entry.update(start=speculative_mesh.started, speculative=True)
+                        done[stage] = await speculative_mesh.join()
+                    else:
+                        done[stage] = await _STAGE_FUNCS[stage](run, done)
+                    await asyncio.to_thread(_trace_artifact, stage, done[stage])
+                await save(stage, done[stage])
+            if speculative_mesh is not None:
+                await speculative_mesh.drain()
+        finally:
+            if speculative_mesh is not None:
+                speculative_mesh.cancel()
+        output = done["mesh"]["glb"] or done["conversion"]["usd_file"]
+        if done["properties"].get("source") != "default":
+            # A job that fell back to default properties is not worth repeating.
+            record = {"output": output, "checkpoints": done}
+            await asyncio.to_thread(CACHE.put_json, _result_key(input_hash), "result.json", record)
+        return output
+
+
+# Record key of the file each stage produces.
+_STAGE_ARTIFACTS = {"mesh": "glb", "conversion": "usd_file", "simulation": "video"}
+
+
+def _checkpoint_valid(stage: str, record: Optional[Dict[str, Any]]) -> bool:
+    """A checkpoint counts only while the artifact it points to still exists."""
+    if not record:
+        return False
+    artifact = _STAGE_ARTIFACTS.get(stage)
+    if artifact is None:
+        return True
+    if record.get(artifact) is None:
+        return bool(record.get("fast_path"))  # no mesh was generated for a fast-path job
+    return Path(record[artifact]).exists()
+
+
+def _valid_checkpoints(checkpoints: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    done = {k: v for k, v in (checkpoints or {}).items() if _checkpoint_valid(k, v)}
+    if done.get("mesh", {}).get("fast_path") and "conversion" not in done:
+        # The reused USD is gone; the fast-path decision has to be made again.
+        del done["mesh"]
+    return done
+
+
+def _result_key(input_hash: str) -> str:
+    """Key of a finished job's stage records: everything that shapes its outputs."""
+    return cache_key(
+        "job", input_hash, NORMALIZE_PARAMS, MESH_PARAMS, PROPERTIES_ESTIMATOR, PROPERTIES_MODEL,
+        PROMPT_VERSION, preprocess_params(), USE_SCALING, FAST_PATH,
+    )
 
-    # generate glb mesh file
+
+def cached_result(input_hash: str) -> Optional[Tuple[str, Dict[str, Dict[str, Any]]]]:
+    """``(output path, checkpoints)`` of an earlier job on the same image, or None.
+
+    Only returned while every stage's artifact still exists, so the caller
+    can mark a new upload done at once instead of queuing it.
+    """
+    record = CACHE.get_json(_result_key(input_hash), "result.json")
+    if record is None:
+        return None
+    done = _valid_checkpoints(record["checkpoints"])
+    if any(stage not in done for stage in PIPELINE_STAGES):
+        return None
+    return record["output"], done
+
+
+def _fast_path_asset(props: Dict[str, Any]) -> Optional[Asset]:
+    """A cataloged asset to reuse for this object, or None to run the full pipeline."""
+    estimate = props.get("props")
+    if not estimate or (estimate.get("confidence_overall") or 0) < FAST_PATH_MIN_CONFIDENCE:
+        return None
+    for asset in open_catalog().confident(props["obj_type"], FAST_PATH_MIN_CONFIDENCE):
+        if Path(asset.usd_file).exists():
+            print(f"[FAST] Reusing cataloged {asset.obj_type!r} asset {asset.id}")
+            return asset
+    return None
+
+
+def _fast_path_records(asset: Asset, stage: str) -> Dict[str, Any]:
+    """Stage records standing in for mesh generation and conversion on the fast path."""
+    job_trace.record(fast_path=asset.id)
+    if stage == "mesh":
+        return {"glb": None, "fast_path": asset.id}
+    return {"usd_file": asset.usd_file, "cache_key": cache_key("asset", asset.id, asset.usd_file), "fast_path": asset.id}
+
+
+def _trace_artifact(stage: str, record: Dict[str, Any]) -> None:
+    """Add the size (and for meshes, face/vertex counts) of *stage*'s output to the job trace."""
+    artifact = _STAGE_ARTIFACTS.get(stage)
+    if artifact is None or record.get(artifact) is None:
+        return
+    path = Path(record[artifact])
+    job_trace.record(bytes=path.stat().st_size)
+    if stage == "mesh":
+        try:
+            job_trace.record(**job_trace.glb_stats(path))
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            print(f"[WARN] Could not read mesh stats from {path}: {e}")
+
+
+async def _stage_mesh(run: _Run, done: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if run.fast_asset is not None:
+        return _fast_path_records(run.fast_asset, "mesh")
+    out_file = run.out_dir / f"{run.job_id}.glb"
+    mesh_key = cache_key("mesh", run.input_hash, NORMALIZE_PARAMS, MESH_PARAMS)
+    if await asyncio.to_thread(CACHE.fetch_file, mesh_key, "mesh.glb", out_file):
+        print(f"[CACHE] Reusing mesh {mesh_key[:12]}")
+        job_trace.record("mesh", cached=True)  # may run while the properties stage is open
+        return {"glb": str(out_file), "cache_key": mesh_key}
+
+    url = _mesh_url()
+    # The normalized image is small; sending bytes keeps file reads off the loop.
+    image = await asyncio.to_thread(run.norm.read_bytes)
+    async with async_stage_slot("mesh"):
+        await run.report("mesh")
+        with STAGE_SECONDS.time(stage="mesh"):
+            size = await apost_to_file(
+                url,
+                out_file,
+                files={"file": (run.norm.name, image, "application/octet-stream")},
+                data={**MESH_PARAMS, "job_id": run.job_id},
+                timeout=(10, 600),
+            )
+    print(f"Request done ({size} bytes).")
+    await asyncio.to_thread(CACHE.put_file, mesh_key, "mesh.glb", out_file)
+    return {"glb": str(out_file), "cache_key": mesh_key}
+
+
+def _mesh_url() -> str:
     ISAAC_INSTANCE_ADDRESS = os.getenv("ISAAC_INSTANCE_ADDRESS")
 
     if ISAAC_INSTANCE_ADDRESS is None:
         raise ValueError("ISAAC_INSTANCE_ADDRESS environment variable not set!")
+    return ISAAC_INSTANCE_ADDRESS
 
-    url = ISAAC_INSTANCE_ADDRESS
-    with open(p, "rb") as f:
-        resp = requests.post(
-            url,
-            files={"file": (p.name, f, "application/octet-stream")},
-            data={"timeout": "300", "job_id": job_id},
-            timeout=(10, 600),
-        )
-    print("Request done.")
-    resp.raise_for_status()
-    out_file = out_dir / f"{job_id}.glb"
-    out_file.write_bytes(resp.content)
-    # out_file="/workspace/scan2wall/src/scan2wall/image_collection/processed/de7e4471f106435f83ee961196855540.glb"
-    # print(out_file)
 
+async def _stage_properties(run: _Run, done: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    props = None
+    if run.props_future is not None:
+        if not run.props_future.done():
+            await run.report("properties")
+        try:
+            # shield: the future is shared with other jobs and must not be cancelled on timeout.
+            props = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(run.props_future)),
+                PROPERTIES_TIMEOUT_S if OFFLINE_FALLBACK else None,
+            )
+        except Exception as e:
+            if not OFFLINE_FALLBACK:
+                raise
+            props = {"error": repr(e)}
+        job_trace.record(**run.props_future.timings)
+    return await asyncio.to_thread(_resolve_properties, run, done, props)
+
+
+def _resolve_properties(run: _Run, done: Dict[str, Dict[str, Any]], props: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The properties record, switching to the offline estimate when that is configured and needed.
+
+    Without the offline fallback a failed estimate means the default
+    parameters, so the job still finishes instead of failing on a missing key.
+    """
+    if props is not None and "error" not in props:
+        return _properties_record(props)
+    if props is None:
+        return _offline_properties(run, done) if OFFLINE_FALLBACK else _properties_record(None)
+    job_trace.record(gemini_error=props["error"])
+    if not OFFLINE_FALLBACK:
+        print(f"[WARN] Gemini estimate failed for job {run.job_id} ({props['error']}); using default properties")
+        return _properties_record(None)
+    print(f"[WARN] Gemini estimate failed for job {run.job_id} ({props['error']}); using the offline estimator")
+    return _offline_properties(run, done)
+
+
+def _offline_properties(run: _Run, done: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    glb = done.get("mesh", {}).get("glb")
+    if glb is None:
+        # Fast-path order: no mesh yet. The loop calls back once it exists.
+        return {"deferred": True}
+    with STAGE_SECONDS.time(stage="properties_offline"):
+        estimate = estimate_from_mesh(glb)
+    job_trace.record(estimator="offline")
+    return _properties_record(estimate, source="offline")
+
+
+def _properties_record(props: Optional[Dict[str, Any]], source: str = "gemini") -> Dict[str, Any]:
+    """Simulation parameters derived from a property estimate (defaults without one)."""
     mass = 1.0
     df = None
     ds = None
     scaling = 1.0
-    if USE_LLM:
-        props = get_object_properties(image_path)
+    obj_type = "sim_run"
+    if props is not None:
         obj_type = props['object_type']
         print(props)
         mass = props["weight_kg"]["value"]
@@ -59,87 +544,215 @@ def process_image(job_id: str, image_path: str) -> str:
             props["dimensions_m"]["width"]["value"],
             props["dimensions_m"]["height"]["value"],
         )
-    print("debug 1")
 
-    
     if not USE_SCALING:
         scaling = 1.0
-    usd_file = convert_mesh(out_file, f"{job_id}.glb", mass=mass, df=df, ds=ds)
-    print("debug 2")
+    return {
+        "obj_type": obj_type, "mass": mass, "df": df, "ds": ds, "scaling": scaling, "props": props,
+        "source": source if props is not None else "default",
+    }
+
+
+async def _stage_conversion(run: _Run, done: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    if run.fast_asset is not None:
+        return _fast_path_records(run.fast_asset, "conversion")
+    props = done["properties"]
+    mass, df, ds = props["mass"], props["df"], props["ds"]
+
+    # Converted USD files may reference sibling assets, so the cache records
+    # where the earlier conversion lives instead of copying it.
+    usd_key = cache_key("usd", done["mesh"]["cache_key"], mass, df, ds)
+    usd_record = await asyncio.to_thread(CACHE.get_json, usd_key, "usd.json")
+    if usd_record is not None and Path(usd_record["usd_file"]).exists():
+        print(f"[CACHE] Reusing USD {usd_record['usd_file']}")
+        job_trace.record(cached=True)
+        return {"usd_file": usd_record["usd_file"], "cache_key": usd_key}
+
+    async with async_stage_slot("conversion"):
+        await run.report("conversion")
+        with STAGE_SECONDS.time(stage="conversion"):
+            usd_file = await convert_mesh_async(done["mesh"]["glb"], f"{run.job_id}.glb", mass=mass, df=df, ds=ds)
+    if not Path(usd_file).exists():
+        raise RuntimeError(f"USD conversion produced no file at {usd_file}")
+    await asyncio.to_thread(_finish_conversion, run.job_id, props, usd_key, usd_file)
+    return {"usd_file": usd_file, "cache_key": usd_key}
+
+
+def _finish_conversion(job_id: str, props: Dict[str, Any], usd_key: str, usd_file: str) -> None:
+    """Cache and catalog a freshly converted USD."""
+    CACHE.put_json(usd_key, "usd.json", {"usd_file": usd_file})
+    if USE_LLM and props.get("source") == "gemini":
+        open_catalog().add(Asset(
+            id=job_id,
+            obj_type=props["obj_type"],
+            usd_file=usd_file,
+            scaling=props["scaling"],
+            mass=props["mass"],
+            static_friction=props["ds"],
+            dynamic_friction=props["df"],
+            confidence=(props.get("props") or {}).get("confidence_overall"),
+        ))
 
-    if USE_LLM:
-        # open csv at /workspace/scan2wall/material_properties/data.csv
-        with open(
-            "/workspace/scan2wall/assets.csv", "a"
-        ) as f:
-            f.write(f"{obj_type},{scaling},{mass},{usd_file}\n")
-    print("debug 3")
 
-    make_throwing_anim(usd_file, scaling, file_name=str(obj_type))
-    return str(out_file)
+async def _stage_simulation(run: _Run, done: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    props = done["properties"]
+    video_key = cache_key("video", done["conversion"]["cache_key"], props["scaling"])
+    video_name = await _recording_name(run, done)
+    video_path = RECORDINGS_DIR / video_name
+    if await asyncio.to_thread(CACHE.fetch_file, video_key, "video.mp4", video_path):
+        print(f"[CACHE] Reusing recording as {video_path}")
+        job_trace.record(cached=True)
+        return {"video": str(video_path)}
 
+    async with async_stage_slot("simulation"):
+        await run.report("simulation")
+        with STAGE_SECONDS.time(stage="simulation"):
+            video_path = await make_throwing_anim_async(
+                done["conversion"]["usd_file"], props["scaling"], file_name=str(props["obj_type"]),
+                video_name=video_name,
+            )
+    if not video_path.exists():
+        raise RuntimeError(f"Simulation produced no recording at {video_path}")
+    await asyncio.to_thread(CACHE.put_file, video_key, "video.mp4", video_path)
+    return {"video": str(video_path)}
 
-def convert_mesh(out_file, fname, mass=None, df=None, ds=None):
+
+async def _recording_name(run: _Run, done: Dict[str, Dict[str, Any]]) -> str:
+    """The job's recording file name, allocated once and kept with its checkpoints."""
+    if "recording" not in done:
+        done["recording"] = {"video_name": await asyncio.to_thread(RECORDING_IDS.name_for)}
+        await run.save("recording", done["recording"])
+    return done["recording"]["video_name"]
+
+
+_STAGE_FUNCS = {
+    "mesh": _stage_mesh,
+    "properties": _stage_properties,
+    "conversion": _stage_conversion,
+    "simulation": _stage_simulation,
+}
+
+
+def _usd_path(fname: str) -> str:
     fname_new = fname.replace(".glb", ".usd")
     print(fname_new)
+    return f"/workspace/isaaclab/{fname_new}"
+
+
+def _conversion_request(out_file, usd_path, mass=None, df=None, ds=None, collision_approximation=None):
+    request = {"input": str(out_file), "output": usd_path}
+    if mass:
+        request["mass"] = mass
+    if ds:
+        request["static_friction"] = ds
+    if df:
+        request["dynamic_friction"] = df
+    if collision_approximation:
+        request["collision_approximation"] = collision_approximation
+    return request
+
+
+def _conversion_command(out_file, usd_path, mass=None, df=None, ds=None, collision_approximation=None):
     m = f"--mass {mass}" if mass else ""
     ds = f"--static-friction {ds}" if ds else ""
     df = f"--dynamic-friction {df}" if df else ""
+    ca = f"--collision-approximation {collision_approximation}" if collision_approximation else ""
 
-    cmd = (
+    return (
         f"python /workspace/scan2wall/isaac_scripts/convert_mesh.py "
-        f"{out_file} /workspace/isaaclab/{fname_new} "
-        f"--kit_args='--headless' {m} {df} {ds}"
+        f"{out_file} {usd_path} "
+        f"--kit_args='--headless' {m} {df} {ds} {ca}"
     )
+    #    --collision-approximation convexHull   --mass 0.35   --com 0 0 0   --inertia 0.00195 0.00195 0.000246   --principal-axes 1 0 0 0   --static-friction 0.6   --dynamic-friction 0.5   --restitution 0.2   --friction-combine average   --restitution-combine min")
 
-    # Spawn in a new process group (detached), but keep a handle to wait later
-    proc = subprocess.Popen(
-        ["/bin/bash", "-lic", cmd],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        start_new_session=True,  # detaches from parent session
-        text=True,
-    )
 
-    for line in proc.stdout:
-        print(line, end="")  # stream live output
+async def convert_mesh_async(out_file, fname, mass=None, df=None, ds=None, collision_approximation=None) -> str:
+    usd_path = _usd_path(fname)
 
-    proc.wait()
+    if USD_CONVERTER_ADDRESS:
+        request = _conversion_request(out_file, usd_path, mass, df, ds, collision_approximation)
+        try:
+            reply = await acall_worker(USD_CONVERTER_ADDRESS, request, timeout=CONVERSION_TIMEOUT_S)
+            print("conversion done (resident converter) :)")
+            job_trace.record(worker=USD_CONVERTER_ADDRESS)
+            return reply["usd_path"]
+        except WorkerUnavailable as e:
+            print(f"[WARN] Resident USD converter unavailable ({e}); launching a one-off conversion.")
 
+    cmd = _conversion_command(out_file, usd_path, mass, df, ds, collision_approximation)
+    code = await run_command(cmd, timeout=CONVERSION_TIMEOUT_S, label="convert")
+    job_trace.record(exit_code=code)
+    if code:
+        print(f"[WARN] convert_mesh.py exited with status {code}")
     print("conversion done :)")
-    return f"/workspace/isaaclab/{fname_new}"
-    #    --collision-approximation convexHull   --mass 0.35   --com 0 0 0   --inertia 0.00195 0.00195 0.000246   --principal-axes 1 0 0 0   --static-friction 0.6   --dynamic-friction 0.5   --restitution 0.2   --friction-combine average   --restitution-combine min")
+    return usd_path
 
 
-def make_throwing_anim(file, scaling=1.0, file_name="sim_run"):
-    print("Creating throwing anim")
-    existing_numbers = []
-    video_dir = Path("/workspace/scan2wall/recordings")
-    for f in video_dir.glob("*.mp4"):
-        try:
-            existing_numbers.append(int(f.stem))
-        except ValueError:
-            pass
+def convert_mesh(out_file, fname, mass=None, df=None, ds=None, collision_approximation=None) -> str:
+    """Blocking ``convert_mesh_async``, for scripts outside the server."""
+    return asyncio.run(convert_mesh_async(out_file, fname, mass, df, ds, collision_approximation))
+
+
+def _throw_request(file, scaling, video_name):
+    return {
+        "usd_path": str(file),
+        "scaling_factor": scaling,
+        "out_dir": str(RECORDINGS_DIR),
+        "video_name": video_name,
+    }
 
-    next_number = max(existing_numbers, default=0) + 1
 
-    video_name = f"{next_number:05d}.mp4"
-    cmd = (
+def _throw_command(file, scaling, video_name):
+    return (
         f"python /workspace/scan2wall/isaac_scripts/test_place_obj_video.py "
-        f"--video --usd_path_abs '{file}' --scaling_factor {scaling} --kit_args='--no-window' --video_name '{video_name}'"
+        f"--video --usd_path_abs '{file}' --scaling_factor {scaling} --kit_args='--no-window' "
+        f"--out_dir '{RECORDINGS_DIR}' --video_name '{video_name}'"
     )
-    proc = subprocess.Popen(
-        ["/bin/bash", "-lic", cmd],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        start_new_session=True,  # fully detached from parent
-    )
-    # for line in proc.stdout:
-    #     print(line, end="")  # stream live output
 
-    proc.wait()
+
+# One slot per resident recorder: holding a slot guarantees _FREE_SIM_WORKERS
+# has an address. The limiter is safe across threads and event loops.
+_SIM_WORKER_SLOTS = StageLimiter({"worker": len(SIM_WORKER_ADDRESSES)})
+_FREE_SIM_WORKERS = deque(SIM_WORKER_ADDRESSES)
+
+
+@asynccontextmanager
+async def _sim_worker() -> AsyncIterator[str]:
+    """Address of a free resident recorder, held for the duration of the block."""
+    async with _SIM_WORKER_SLOTS.async_slot("worker"):
+        address = _FREE_SIM_WORKERS.popleft()
+        try:
+            yield address
+        finally:
+            _FREE_SIM_WORKERS.append(address)
+
+
+async def make_throwing_anim_async(file, scaling=1.0, file_name="sim_run", video_name=None) -> Path:
+    print("Creating throwing anim")
+    video_name = video_name or await asyncio.to_thread(RECORDING_IDS.name_for)
+
+    if SIM_WORKER_ADDRESSES:
+        async with _sim_worker() as address:
+            try:
+                request = _throw_request(file, scaling, video_name)
+                reply = await acall_worker(address, request, timeout=SIMULATION_TIMEOUT_S)
+                print(f"DONE! :) (simulation worker {address})")
+                job_trace.record(worker=address)
+                return Path(reply["video_path"])
+            except WorkerUnavailable as e:
+                print(f"[WARN] Simulation worker unavailable ({e}); launching a one-off recording.")
+
+    code = await run_command(_throw_command(file, scaling, video_name), timeout=SIMULATION_TIMEOUT_S, label="sim")
+    job_trace.record(exit_code=code)
+    if code:
+        print(f"[WARN] test_place_obj_video.py exited with status {code}")
     print("DONE! :)")
+    return RECORDINGS_DIR / video_name
+
 
+def make_throwing_anim(file, scaling=1.0, file_name="sim_run", video_name=None) -> Path:
+    """Blocking ``make_throwing_anim_async``, for scripts outside the server."""
+    return asyncio.run(make_throwing_anim_async(file, scaling, file_name, video_name))
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,63 @@
+"""Per-job image normalization.
+
+Phone photos arrive at 12+ MP with EXIF rotation, while the mesh workflow and
+Gemini only need roughly 1024 px. Each job normalizes its upload once: the
+orientation is applied, the image is downscaled to a long edge, and the result
+is re-encoded as a compact JPEG/WebP that every later stage reuses.
+"""
+from __future__ import annotations
+
+import os
+import uuid
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+NORMALIZE_LONG_EDGE = int(os.getenv("NORMALIZE_LONG_EDGE", "1536"))
+NORMALIZE_FORMAT = os.getenv("NORMALIZE_FORMAT", "jpeg").lower()  # "jpeg" or "webp"
+NORMALIZE_QUALITY = int(os.getenv("NORMALIZE_QUALITY", "90"))
+
+_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+
+def normalized_path(image_path: Path, fmt: str = NORMALIZE_FORMAT) -> Path:
+    """Where the derived image for *image_path* lives."""
+    image_path = Path(image_path)
+    return image_path.parent.parent / "normalized" / f"{image_path.stem}{_EXTENSIONS[fmt]}"
+
+
+def normalize_image(
+    image_path: Path,
+    long_edge: int = NORMALIZE_LONG_EDGE,
+    fmt: str = NORMALIZE_FORMAT,
+    quality: int = NORMALIZE_QUALITY,
+) -> Path:
+    """Write the orientation-corrected, downscaled copy of *image_path* and return its path.
+
+    Reuses an existing derived file, so calling this again for the same job is
+    free. A non-positive *long_edge* disables normalization.
+    """
+    if long_edge <= 0:
+        return Path(image_path)
+    dest = normalized_path(image_path, fmt)
+    if dest.exists():
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(image_path) as img:
+        # JPEG decoders can downscale by 1/2..1/8 while decoding.
+        img.draft("RGB", (long_edge, long_edge))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if fmt == "webp" and img.mode in ("RGBA", "LA", "P") else "RGB")
+        img.thumbnail((long_edge, long_edge), Image.Resampling.LANCZOS)
+
+        # Unique temp name: the upload-time prefetch and the pipeline may race here.
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.tmp")
+        save_kwargs = {"quality": quality}
+        if fmt == "jpeg":
+            save_kwargs.update(optimize=True, progressive=True)
+        else:
+            save_kwargs.update(method=4)
+        img.save(tmp, format=fmt.upper(), **save_kwargs)
+    os.replace(tmp, dest)
+    return dest
@@ -0,0 +1,57 @@
+"""Allocation of recording numbers (``00005.mp4``) for simulation videos.
+
+The next number used to be found by globbing the recordings directory, which
+grew with the archive and handed the same number to jobs finishing together.
+``RecordingIds`` keeps a persistent counter updated under an exclusive
+``fcntl`` lock. The pipeline stores the number a job got in the job record,
+so a retried job records over its own video instead of taking a new one.
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+from pathlib import Path
+
+RECORDING_COUNTER_PATH = Path(os.getenv("RECORDING_COUNTER_PATH", "/workspace/scan2wall/video_counter.txt"))
+
+
+def video_name(number: int) -> str:
+    return f"{number:05d}.mp4"
+
+
+class RecordingIds:
+    def __init__(self, counter_path: Path, recordings_dir: Path):
+        self.counter_path = Path(counter_path)
+        self.recordings_dir = Path(recordings_dir)
+        self._seeded = False
+
+    def _seed(self) -> int:
+        """Highest number already on disk."""
+        numbers = [int(f.stem) for f in self.recordings_dir.glob("*.mp4") if f.stem.isdigit()]
+        return max(numbers, default=0)
+
+    def allocate(self) -> int:
+        """Take the next recording number that has no video on disk yet."""
+        self.counter_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.counter_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            text = f.read().strip()
+            number = int(text) if text else 0
+            if not self._seeded:
+                # The counter can lag behind the archive (the repo ships one,
+                # recordings get copied in), so catch up once per process.
+                number = max(number, self._seed())
+                self._seeded = True
+            number += 1
+            while (self.recordings_dir / video_name(number)).exists():
+                number += 1  # written by something that bypasses the counter
+            f.seek(0)
+            f.truncate()
+            f.write(f"{number}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return number
+
+    def name_for(self) -> str:
+        return video_name(self.allocate())
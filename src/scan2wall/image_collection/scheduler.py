@@ -0,0 +1,450 @@
+"""Bounded pipeline scheduler for the upload server.
+
+Jobs are admitted into a bounded queue and run by a fixed set of worker
+threads (``PipelineScheduler``) or asyncio tasks (``AsyncPipelineScheduler``).
+Inside a job, each GPU/subprocess-heavy stage (mesh generation, USD
+conversion, simulation) must hold one of that stage's slots, so several jobs
+can be pipelined without overcommitting any single backend.
+
+Every job has a priority class (``interactive``, ``batch``, ``background``).
+Both the admission queue and each stage's slots are handed out by a
+``FairQueue``: classes share capacity in proportion to their weights, and
+anything that has waited longer than ``PIPELINE_MAX_WAIT_S`` goes first, so
+a large batch cannot hold up a live upload and background work still runs.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+PIPELINE_STAGES = ("mesh", "conversion", "simulation")
+
+# Highest priority first; ties in the fair-share order go to the earlier class.
+PRIORITY_CLASSES = ("interactive", "batch", "background")
+DEFAULT_PRIORITY = "interactive"
+DEFAULT_WEIGHTS = {"interactive": 8, "batch": 3, "background": 1}
+PIPELINE_MAX_WAIT_S = float(os.getenv("PIPELINE_MAX_WAIT_S", "600"))
+
+# Priority of the job running in the current worker thread/task; stage slots read it.
+_PRIORITY: contextvars.ContextVar[str] = contextvars.ContextVar("pipeline_priority", default=DEFAULT_PRIORITY)
+
+
+def current_priority() -> str:
+    return _PRIORITY.get()
+
+
+def weights_from_env() -> Dict[str, float]:
+    return {
+        c: max(0.01, float(os.getenv(f"PIPELINE_WEIGHT_{c.upper()}", str(DEFAULT_WEIGHTS[c]))))
+        for c in PRIORITY_CLASSES
+    }
+
+
+class QueueFull(Exception):
+    """Raised when the admission queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pipeline queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class FairQueue:
+    """Per-class FIFO queues served by weighted fair sharing (stride scheduling).
+
+    Each pop charges the chosen class ``1 / weight`` of virtual time and the
+    class with the least virtual time goes next, so with weights 8:3:1 and
+    all classes busy, 8 of every 12 pops are interactive. A class that was
+    idle resumes at the current virtual time instead of cashing in credit.
+    An item older than *max_wait* seconds is served before anything else.
+    Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, weights: Dict[str, float], max_wait: float = PIPELINE_MAX_WAIT_S):
+        self.weights = dict(weights)
+        self.max_wait = max_wait
+        self._queues: Dict[str, Deque[Tuple[float, Any]]] = {c: deque() for c in PRIORITY_CLASSES}
+        self._pass = {c: 0.0 for c in PRIORITY_CLASSES}
+        self._vtime = 0.0
+
+    def push(self, priority: str, item: Any) -> None:
+        queue = self._queues[priority]
+        if not queue:
+            self._pass[priority] = max(self._pass[priority], self._vtime)
+        queue.append((time.monotonic(), item))
+
+    def pop(self) -> Any:
+        """Remove and return the next item; ``IndexError`` if empty."""
+        busy = [c for c in PRIORITY_CLASSES if self._queues[c]]
+        if not busy:
+            raise IndexError("pop from an empty FairQueue")
+        oldest = min(busy, key=lambda c: self._queues[c][0][0])
+        if time.monotonic() - self._queues[oldest][0][0] >= self.max_wait:
+            chosen = oldest  # starvation protection
+        else:
+            chosen = min(busy, key=lambda c: self._pass[c])  # min() keeps PRIORITY_CLASSES order on ties
+        self._vtime = max(self._vtime, self._pass[chosen])
+        self._pass[chosen] += 1.0 / self.weights[chosen]
+        return self._queues[chosen].popleft()[1]
+
+    def remove(self, item: Any) -> bool:
+        for queue in self._queues.values():
+            for entry in queue:
+                if entry[1] is item:
+                    queue.remove(entry)
+                    return True
+        return False
+
+    def items(self, priority: str) -> List[Any]:
+        return [item for _, item in self._queues[priority]]
+
+    def depth(self, priority: Optional[str] = None) -> int:
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(q) for q in self._queues.values())
+
+    def __len__(self) -> int:
+        return self.depth()
+
+
+class FairExecutor:
+    """Thread pool whose waiting tasks are handed out by a ``FairQueue``.
+
+    Like ``ThreadPoolExecutor.submit``, but each task carries a priority
+    class, so work queued for a live upload is not stuck behind a batch.
+    The task runs with that class as ``current_priority()``.
+    """
+
+    def __init__(self, workers: int, weights: Optional[Dict[str, float]] = None,
+                 max_wait: float = PIPELINE_MAX_WAIT_S, name: str = "fair"):
+        self.workers = max(1, workers)
+        self.name = name
+        self._queue = FairQueue(weights or dict(DEFAULT_WEIGHTS), max_wait)
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, priority: str, fn: Callable[..., Any], *args: Any) -> Future:
+        _check_priority(priority)
+        future: Future = Future()
+        with self._cond:
+            self._queue.push(priority, (future, priority, fn, args))
+            if len(self._threads) < self.workers:
+                t = threading.Thread(target=self._worker, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            self._cond.notify()
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                future, priority, fn, args = self._queue.pop()
+            if not future.set_running_or_notify_cancel():
+                continue
+            _PRIORITY.set(priority)
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+class _AsyncTicket:
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+
+    def grant(self) -> None:
+        # May be called from a worker thread releasing a slot.
+        self._loop.call_soon_threadsafe(self._set)
+
+    def _set(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+    async def wait(self) -> None:
+        await self._future
+
+
+class StageLimiter:
+    """Per-stage concurrency limits shared by every pipeline worker.
+
+    A freed slot goes straight to the next waiter chosen by that stage's
+    ``FairQueue``, so priorities apply at each GPU-bound stage, not only at
+    admission. Jobs on every event loop (each thread worker runs its own)
+    draw from the same slots.
+    """
+
+    def __init__(self, slots: Dict[str, int], weights: Optional[Dict[str, float]] = None,
+                 max_wait: float = PIPELINE_MAX_WAIT_S):
+        self.slots = dict(slots)
+        weights = weights or dict(DEFAULT_WEIGHTS)
+        self._free = {name: max(1, n) for name, n in self.slots.items()}
+        self._waiters = {name: FairQueue(weights, max_wait) for name in self.slots}
+        self._lock = threading.Lock()
+        self._in_use = {name: 0 for name in self.slots}
+
+    @classmethod
+    def from_env(cls) -> "StageLimiter":
+        return cls(
+            {s: int(os.getenv(f"PIPELINE_SLOTS_{s.upper()}", "1")) for s in PIPELINE_STAGES},
+            weights_from_env(),
+        )
+
+    def _try_acquire(self, stage: str, priority: str, ticket: Any) -> bool:
+        """Take a free slot now, or queue *ticket* to be granted one later."""
+        with self._lock:
+            if self._free[stage] > 0 and not self._waiters[stage]:
+                self._free[stage] -= 1
+                self._in_use[stage] += 1
+                return True
+            self._waiters[stage].push(priority, ticket)
+            return False
+
+    def _release(self, stage: str) -> None:
+        with self._lock:
+            self._in_use[stage] -= 1
+            if self._waiters[stage]:
+                self._in_use[stage] += 1
+                self._waiters[stage].pop().grant()  # the slot passes on directly
+            else:
+                self._free[stage] += 1
+
+    @asynccontextmanager
+    async def async_slot(self, stage: str, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold one slot of *stage* for the duration of the block, waiting without blocking the event loop."""
+        ticket = _AsyncTicket()
+        if not self._try_acquire(stage, priority or current_priority(), ticket):
+            try:
+                await ticket.wait()
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = not self._waiters[stage].remove(ticket)
+                if granted:
+                    self._release(stage)
+                raise
+        try:
+            yield
+        finally:
+            self._release(stage)
+
+    def in_use(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._in_use)
+
+
+STAGE_LIMITS = StageLimiter.from_env()
+
+
+def async_stage_slot(stage: str):
+    """Hold a slot of *stage* from the process-wide limiter, at the current job's priority."""
+    return STAGE_LIMITS.async_slot(stage)
+
+
+class PipelineScheduler:
+    """Fixed worker pool fed from a bounded, priority-aware queue.
+
+    *max_queue* bounds each priority class separately, so a full batch
+    backlog never turns away an interactive upload.
+    """
+
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, run: Callable[..., None], workers: int = 2, max_queue: int = 20,
+                 weights: Optional[Dict[str, float]] = None, max_wait: float = PIPELINE_MAX_WAIT_S):
+        self._run = run
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._queue = FairQueue(weights or dict(DEFAULT_WEIGHTS), max_wait)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = 0
+        self._stopping = False
+        self._avg_duration = 120.0  # seconds, EWMA of finished jobs
+
+    @classmethod
+    def from_env(cls, run: Callable[..., None]) -> "PipelineScheduler":
+        return cls(
+            run,
+            workers=int(os.getenv("PIPELINE_WORKERS", str(cls.DEFAULT_WORKERS))),
+            max_queue=int(os.getenv("PIPELINE_MAX_QUEUE", "20")),
+            weights=weights_from_env(),
+        )
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"pipeline-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+    def submit(self, job_id: str, *args: Any, priority: str = DEFAULT_PRIORITY) -> int:
+        """Queue a job; return its 1-based position within its class or raise ``QueueFull``."""
+        _check_priority(priority)
+        with self._cond:
+            if self._queue.depth(priority) >= self.max_queue:
+                raise QueueFull(self.retry_after())
+            self._queue.push(priority, (job_id, args, priority))
+            self._wake_workers()
+            return self._queue.depth(priority)
+
+    def submit_many(self, jobs: List[Tuple[str, Tuple[Any, ...]]], priority: str = DEFAULT_PRIORITY) -> List[int]:
+        """Queue several jobs atomically: either all fit or ``QueueFull`` is raised."""
+        _check_priority(priority)
+        with self._cond:
+            if self._queue.depth(priority) + len(jobs) > self.max_queue:
+                raise QueueFull(self.retry_after())
+            positions = []
+            for job_id, args in jobs:
+                self._queue.push(priority, (job_id, args, priority))
+                positions.append(self._queue.depth(priority))
+            self._wake_workers()
+            return positions
+
+    def _wake_workers(self) -> None:
+        """Called with ``_cond`` held after jobs were queued."""
+        self._cond.notify_all()
+
+    def free_slots(self, priority: str = DEFAULT_PRIORITY) -> int:
+        with self._cond:
+            return max(0, self.max_queue - self._queue.depth(priority))
+
+    def is_full(self, priority: str = DEFAULT_PRIORITY) -> bool:
+        with self._cond:
+            return self._queue.depth(priority) >= self.max_queue
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position among waiting jobs of the same class, or None if not waiting."""
+        with self._cond:
+            for priority in PRIORITY_CLASSES:
+                for i, (queued_id, _, _) in enumerate(self._queue.items(priority), start=1):
+                    if queued_id == job_id:
+                        return i
+        return None
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def depth_by_priority(self) -> Dict[str, int]:
+        with self._cond:
+            return {c: self._queue.depth(c) for c in PRIORITY_CLASSES}
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return self._running
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up (one job finishing)."""
+        return max(1, math.ceil(self._avg_duration / self._parallelism()))
+
+    def _parallelism(self) -> int:
+        return self.workers
+
+    def _finished(self, elapsed: float) -> None:
+        with self._cond:
+            self._running -= 1
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * elapsed
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job_id, args, priority = self._queue.pop()
+                self._running += 1
+            _PRIORITY.set(priority)
+            start = time.monotonic()
+            try:
+                self._run(job_id, *args)
+            except Exception as e:  # _run is expected to record its own failures
+                print(f"[ERROR] Pipeline worker crashed on job {job_id}: {e}")
+            finally:
+                self._finished(time.monotonic() - start)
+
+
+class AsyncPipelineScheduler(PipelineScheduler):
+    """Same queue and admission rules, but workers are tasks on the server's event loop.
+
+    *run* is a coroutine function. Waiting jobs cost a task instead of an OS
+    thread, so the worker count can be large; the stage slots still bound how
+    much work reaches each backend.
+    """
+
+    DEFAULT_WORKERS = 64
+
+    def __init__(self, run: Callable[..., Awaitable[None]], workers: int = 64, max_queue: int = 20,
+                 weights: Optional[Dict[str, float]] = None, max_wait: float = PIPELINE_MAX_WAIT_S):
+        super().__init__(run, workers, max_queue, weights, max_wait)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Spawn the worker tasks; must be called from the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        for i in range(self.workers):
+            self._tasks.append(self._loop.create_task(self._worker(), name=f"pipeline-worker-{i}"))
+
+    def shutdown(self) -> None:
+        """Stop taking jobs and cancel running ones (their subprocesses are killed)."""
+        with self._cond:
+            self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+
+    def _wake_workers(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> Optional[Tuple[str, Tuple[Any, ...], str]]:
+        with self._cond:
+            if self._stopping or not self._queue:
+                return None
+            self._running += 1
+            return self._queue.pop()
+
+    def _parallelism(self) -> int:
+        # Jobs overlap only as far as the narrowest stage allows.
+        return max(1, min(self.workers, *STAGE_LIMITS.slots.values()))
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            item = self._take()
+            if item is None:
+                self._wake.clear()
+                item = self._take()
+                if item is None:
+                    await self._wake.wait()
+                    continue
+            job_id, args, priority = item
+            _PRIORITY.set(priority)  # each worker task has its own context
+            start = time.monotonic()
+            try:
+                await self._run(job_id, *args)
+            except Exception as e:  # _run is expected to record its own failures
+                print(f"[ERROR] Pipeline worker crashed on job {job_id}: {e}")
+            finally:
+                self._finished(time.monotonic() - start)
+
+
+def _check_priority(priority: str) -> None:
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class {priority!r}; expected one of {', '.join(PRIORITY_CLASSES)}")
@@ -1,14 +1,50 @@
 import google.generativeai as genai
-from PIL import Image
 import json
 import os
 import argparse
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from dotenv import load_dotenv
+from scan2wall.material_properties.preprocess import compact_image, preprocess_params
+from scan2wall.material_properties.property_cache import image_key, open_property_cache
+from scan2wall.material_properties.schema import InvalidProperties, parse_properties, validate_properties
 
 # Configure Gemini
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("gemini-2.0-flash")
+MODEL_NAME = "gemini-2.0-flash"
+model = genai.GenerativeModel(MODEL_NAME)
+
+# Images packed into one request by get_object_properties_batch.
+GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "8"))
+
+# Attempts per call; an answer that fails validation is retried at once, API errors after a short backoff.
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_BACKOFF_S = 0.5
+# Wall-clock budget for one call including retries; past it an error dict is
+# returned, which the pipeline's offline fallback picks up.
+GEMINI_DEADLINE_S = float(os.getenv("GEMINI_DEADLINE_S", "45"))
+# Hedging: if a request has not answered within this percentile of recent
+# latencies of requests with as many images, fire a duplicate and take
+# whichever valid answer comes first.
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "0") == "1"
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "90"))
+GEMINI_HEDGE_MIN_SAMPLES = 20
+GEMINI_HEDGE_MIN_DELAY_S = 1.0
+
+# Requests run here so a call can stop waiting at its deadline or hedge;
+# an abandoned request finishes in the background.
+GEMINI_REQUEST_WORKERS = int(os.getenv("GEMINI_REQUEST_WORKERS", "8"))
+_REQUEST_POOL = ThreadPoolExecutor(max_workers=GEMINI_REQUEST_WORKERS, thread_name_prefix="gemini")
+# Recent latencies by images per request: a batch answers slower than one image.
+_LATENCIES = defaultdict(lambda: deque(maxlen=200))
+_STATS_LOCK = threading.Lock()
+_STATS = {"request": 0, "hedge": 0, "retry": 0, "invalid": 0, "timeout": 0}
+
+# Bump whenever the prompt changes so cached answers to the old prompt are not reused.
+PROMPT_VERSION = "1"
 
 # Prompt text enforcing JSON schema
 prompt = """
@@ -41,23 +77,216 @@ Guidelines:
 - Return only the JSON, no prose.
 """
 
-def get_object_properties(image_path):
-    img = Image.open(image_path)
+batch_prompt = prompt + """
+You will receive several images, each preceded by a line "Image <index>:".
+Return ONLY a JSON array with exactly one object per image. Each object follows
+the schema above and has one extra field, "index": the image's integer index.
+"""
+
+class DeadlineExceeded(TimeoutError):
+    """No valid answer before the call's deadline."""
+
+
+def call_stats():
+    """Request, hedge, retry, invalid-answer and timeout counts since the process started."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
 
-    # Call the model
+def _count(name):
+    with _STATS_LOCK:
+        _STATS[name] += 1
+
+
+def _hedge_delay(images):
+    """Seconds before a duplicate of an *images*-image request is fired, or None until enough latencies are known."""
+    with _STATS_LOCK:
+        samples = sorted(_LATENCIES[images])
+    if not GEMINI_HEDGE or len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+        return None
+    rank = min(len(samples) - 1, int(len(samples) * GEMINI_HEDGE_PERCENTILE / 100))
+    return max(samples[rank], GEMINI_HEDGE_MIN_DELAY_S)
+
+
+def _request(contents, max_output_tokens, images):
+    _count("request")
+    start = time.monotonic()
     response = model.generate_content(
-        [prompt, img],
+        contents,
         generation_config={
             "temperature": 0.2,
-            "max_output_tokens": 512,
+            "max_output_tokens": max_output_tokens,
             "response_mime_type": "application/json",
         },
     )
+    text = response.text
+    with _STATS_LOCK:
+        _LATENCIES[images].append(time.monotonic() - start)
+    return text
+
+
+def _first_valid(contents, max_output_tokens, deadline, parse, images=1):
+    """``parse`` of the first answer that passes it, hedging a slow request with a duplicate.
+
+    *images* is how many images *contents* holds; hedging compares against
+    requests of that size only.
+
+    Raises the last answer's error when every request failed, or
+    ``DeadlineExceeded`` once *deadline* (a ``time.monotonic`` value) passes.
+    """
+    pending = {_REQUEST_POOL.submit(_request, contents, max_output_tokens, images)}
+    delay = _hedge_delay(images)
+    hedge_at = time.monotonic() + delay if delay is not None else None
+    error = None
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            raise DeadlineExceeded("Gemini deadline exceeded")
+        wake = deadline if hedge_at is None else min(deadline, hedge_at)
+        finished, pending = wait(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+        for future in finished:
+            try:
+                return parse(future.result())
+            except Exception as e:
+                error = e
+        if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+            _count("hedge")
+            pending.add(_REQUEST_POOL.submit(_request, contents, max_output_tokens, images))
+            hedge_at = None
+    raise error
 
-    # Parse response JSON
+
+def _retry_hint(problems):
+    return (
+        "Your previous answer did not match the schema: " + "; ".join(problems[:10])
+        + ". Answer again with ONLY the JSON object in the exact schema."
+    )
+
+
+def get_object_properties(image_path, use_cache=True, deadline_s=GEMINI_DEADLINE_S):
+    """Estimate physical properties of the object in *image_path* with Gemini.
+
+    The photo is sent as a downscaled JPEG (see ``preprocess.compact_image``).
+    Answers are cached on disk by image content, model, prompt version and
+    preprocessing settings; pass ``use_cache=False`` to force a fresh call
+    (the result still refreshes the cache).
+
+    Only answers that pass ``schema.validate_properties`` are returned. An
+    invalid answer is retried immediately with the problems quoted back to
+    the model, API errors after a short backoff, up to ``GEMINI_MAX_ATTEMPTS``
+    in total and within *deadline_s*. When that fails the result is
+    ``{"error": ...}``.
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    cache = open_property_cache()
+    key = image_key(data, MODEL_NAME, PROMPT_VERSION, preprocess_params())
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    img = {"mime_type": "image/jpeg", "data": compact_image(data)}
+    contents = [prompt, img]
+    deadline = time.monotonic() + deadline_s
+    error = None
+    attempts = max(1, GEMINI_MAX_ATTEMPTS)
+    for attempt in range(attempts):
+        if attempt:
+            _count("retry")
+        try:
+            result = _first_valid(contents, 512, deadline, parse_properties)
+        except InvalidProperties as e:
+            _count("invalid")
+            error = {"error": f"Invalid properties returned: {e}", "raw": e.raw}
+            contents = [prompt, img, _retry_hint(e.problems)]
+        except DeadlineExceeded:
+            _count("timeout")
+            return {"error": f"Gemini did not answer within {deadline_s:g}s"}
+        except Exception as e:
+            error = {"error": f"Gemini request failed: {e!r}"}
+            if attempt + 1 < attempts:
+                time.sleep(max(0.0, min(GEMINI_BACKOFF_S * 2 ** attempt, deadline - time.monotonic())))
+        else:
+            cache.put(key, result)
+            return result
+        if time.monotonic() >= deadline:
+            break
+    print(f"[WARN] Property estimate for {image_path} failed: {error['error']}")
+    return error
+
+
+def _parse_batch(text):
+    """``{index: answer}`` from a batched response; entries are validated by the caller."""
     try:
-        result = json.loads(response.text)
-    except json.JSONDecodeError:
-        result = {"error": "Invalid JSON returned", "raw": response.text}
+        answers = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise InvalidProperties([f"invalid JSON: {e}"], text)
+    if not isinstance(answers, list):
+        raise InvalidProperties(["expected a JSON array"], text)
+    results = {}
+    for answer in answers:
+        if isinstance(answer, dict) and isinstance(answer.get("index"), int):
+            results[answer.pop("index")] = answer
+    return results
+
+
+def _estimate_batch(images):
+    """One Gemini request for *images* (JPEG bytes); returns ``{index: result}`` of the parsed answers."""
+    contents = [batch_prompt, f"{len(images)} images follow."]
+    for i, data in enumerate(images):
+        contents += [f"Image {i}:", {"mime_type": "image/jpeg", "data": data}]
+    return _first_valid(contents, 512 * len(images), time.monotonic() + GEMINI_DEADLINE_S, _parse_batch, len(images))
+
+
+def get_object_properties_batch(image_paths, batch_size=GEMINI_BATCH_SIZE, use_cache=True, on_result=None):
+    """``get_object_properties`` for many images, packing up to *batch_size* into each request.
+
+    Results come back in the order of *image_paths*. Cached images are not
+    sent at all. An image whose answer is missing or fails validation, or
+    whose whole request failed, gets its own ``get_object_properties`` call;
+    those run concurrently. *on_result*, if given, is called with
+    ``(index, result)`` as soon as each image's result is known.
+    """
+    cache = open_property_cache()
+    params = preprocess_params()
+    results = [None] * len(image_paths)
+
+    def resolve(i, result):
+        results[i] = result
+        if on_result is not None:
+            on_result(i, result)
+
+    pending = []
+    for i, image_path in enumerate(image_paths):
+        with open(image_path, "rb") as f:
+            data = f.read()
+        key = image_key(data, MODEL_NAME, PROMPT_VERSION, params)
+        cached = cache.get(key) if use_cache else None
+        if cached is not None:
+            resolve(i, cached)
+        else:
+            pending.append((i, key, data))
+    if not pending:
+        return results
 
-    return result
\ No newline at end of file
+    fallbacks = {}
+    workers = min(len(pending), GEMINI_REQUEST_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-fallback") as pool:
+        for start in range(0, len(pending), max(1, batch_size)):
+            chunk = pending[start:start + max(1, batch_size)]
+            try:
+                answers = _estimate_batch([compact_image(data) for _, _, data in chunk])
+            except Exception as e:
+                print(f"[WARN] Batched property estimate of {len(chunk)} images failed: {e}")
+                answers = {}
+            for n, (i, key, _) in enumerate(chunk):
+                answer = answers.get(n)
+                if answer is not None and not validate_properties(answer):
+                    cache.put(key, answer)
+                    resolve(i, answer)
+                else:
+                    fallbacks[pool.submit(get_object_properties, image_paths[i], use_cache=False)] = i
+        for future in as_completed(fallbacks):
+            resolve(fallbacks[future], future.result())
+    return results
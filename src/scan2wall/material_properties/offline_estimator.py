@@ -0,0 +1,125 @@
+"""Material properties from mesh geometry, without Gemini.
+
+Computes volume, bounding extents and centre of mass of the generated GLB
+with trimesh and combines them with a bundled material table to produce the
+same dict ``get_object_properties`` returns. Used when
+``PROPERTIES_ESTIMATOR=offline``, or as the fallback when Gemini fails or
+is too slow.
+
+Generated meshes come out in arbitrary units, so the real size is an input:
+the longest edge is assumed to be ``OFFLINE_OBJECT_SIZE_M`` unless a size
+hint is given.
+
+    python offline_estimator.py mesh.glb --material wood --size 0.3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Any, Dict, Optional
+
+import trimesh
+
+OFFLINE_MATERIAL = os.getenv("OFFLINE_MATERIAL", "plastic")
+OFFLINE_OBJECT_SIZE_M = float(os.getenv("OFFLINE_OBJECT_SIZE_M", "0.25"))
+# Reported as confidence_overall; kept below FAST_PATH_MIN_CONFIDENCE so
+# offline guesses are never reused as fast-path assets.
+OFFLINE_CONFIDENCE = 0.2
+
+# density: kg/m^3 of the material itself.
+# fill: typical fraction of an everyday object's enclosed volume that is
+#   material (generated meshes are closed shells, so a mug or box would
+#   otherwise be weighed as a solid block).
+# static / dynamic: friction against a smooth wood or steel table top.
+MATERIALS: Dict[str, Dict[str, float]] = {
+    "plastic": {"density": 1050, "fill": 0.3, "static": 0.40, "dynamic": 0.30},
+    "wood": {"density": 700, "fill": 0.8, "static": 0.50, "dynamic": 0.40},
+    "metal": {"density": 7850, "fill": 0.15, "static": 0.55, "dynamic": 0.45},
+    "aluminum": {"density": 2700, "fill": 0.2, "static": 0.50, "dynamic": 0.40},
+    "glass": {"density": 2500, "fill": 0.25, "static": 0.50, "dynamic": 0.40},
+    "ceramic": {"density": 2400, "fill": 0.35, "static": 0.55, "dynamic": 0.45},
+    "rubber": {"density": 1100, "fill": 0.9, "static": 0.90, "dynamic": 0.70},
+    "cardboard": {"density": 690, "fill": 0.1, "static": 0.45, "dynamic": 0.35},
+    "paper": {"density": 800, "fill": 0.7, "static": 0.40, "dynamic": 0.30},
+    "fabric": {"density": 300, "fill": 1.0, "static": 0.60, "dynamic": 0.50},
+    "foam": {"density": 50, "fill": 1.0, "static": 0.70, "dynamic": 0.60},
+    "stone": {"density": 2600, "fill": 1.0, "static": 0.60, "dynamic": 0.50},
+}
+# Spellings Gemini or users commonly use for the table's materials.
+_ALIASES = {
+    "steel": "metal", "iron": "metal", "stainless steel": "metal", "aluminium": "aluminum",
+    "porcelain": "ceramic", "clay": "ceramic", "pottery": "ceramic", "abs": "plastic",
+    "polypropylene": "plastic", "polyethylene": "plastic", "silicone": "rubber",
+    "cotton": "fabric", "textile": "fabric", "leather": "fabric", "marble": "stone",
+    "concrete": "stone", "granite": "stone", "cardboard box": "cardboard",
+}
+
+
+def lookup_material(name: str) -> Optional[str]:
+    """Table key for a material name, or None if it is not in the table."""
+    name = " ".join(str(name).lower().split())
+    name = _ALIASES.get(name, name)
+    return name if name in MATERIALS else None
+
+
+def estimate_from_mesh(
+    glb_path: str,
+    material: str = OFFLINE_MATERIAL,
+    size_m: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Properties of the object in *glb_path*, in the ``get_object_properties`` schema.
+
+    *size_m* is the real length of the mesh's longest edge (default
+    ``OFFLINE_OBJECT_SIZE_M``). Unknown materials fall back to ``plastic``.
+    """
+    key = lookup_material(material) or "plastic"
+    entry = MATERIALS[key]
+    size_m = size_m or OFFLINE_OBJECT_SIZE_M
+
+    mesh = trimesh.load(glb_path, force="mesh")
+    extents = sorted((float(e) for e in mesh.extents), reverse=True)
+    if extents[0] <= 0:
+        raise ValueError(f"{glb_path} has an empty or degenerate mesh")
+    scale = size_m / extents[0]
+    # Open or self-intersecting meshes have no meaningful volume; their hull is a fair upper bound.
+    solid = mesh if mesh.is_watertight and mesh.volume > 0 else mesh.convex_hull
+    volume_m3 = float(solid.volume) * scale ** 3
+    mass = volume_m3 * entry["density"] * entry["fill"]
+    center = [float(c) * scale for c in solid.center_mass]
+
+    return {
+        "object_type": "unknown object",
+        "use_case": "unknown",
+        "materials": [{"name": key, "prob": 1.0}],
+        "rigidity": "deformable" if key in ("fabric", "foam") else "rigid",
+        "dimensions_m": {
+            "length": {"value": extents[0] * scale},
+            "width": {"value": extents[1] * scale},
+            "height": {"value": extents[2] * scale},
+        },
+        "weight_kg": {"value": round(max(mass, 0.001), 4)},
+        "friction_coefficients": {"static": entry["static"], "dynamic": entry["dynamic"]},
+        "volume_m3": volume_m3,
+        "center_of_mass_m": center,
+        "assumptions": [
+            f"longest edge is {size_m} m",
+            f"material is {key} ({entry['density']} kg/m^3, {entry['fill']:.0%} of enclosed volume)",
+            "volume from the " + ("closed mesh" if solid is mesh else "convex hull"),
+        ],
+        "confidence_overall": OFFLINE_CONFIDENCE,
+        "estimator": "offline",
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Estimate physical properties from a GLB mesh.")
+    parser.add_argument("glb")
+    parser.add_argument("--material", default=OFFLINE_MATERIAL, help=", ".join(MATERIALS))
+    parser.add_argument("--size", type=float, default=None, help="real length of the longest edge in meters")
+    args = parser.parse_args(argv)
+    print(json.dumps(estimate_from_mesh(args.glb, args.material, args.size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
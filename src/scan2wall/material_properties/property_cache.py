@@ -0,0 +1,131 @@
+"""Persistent LRU cache of Gemini property estimates.
+
+Gemini answers at ``temperature=0.2``, so the same photo gets practically the
+same answer every time; paying a network round trip for it on repeat scans
+and pipeline retries is pure latency. Results are stored in a small SQLite
+file keyed by the image's content hash, the model name, the prompt version
+and the preprocessing settings, so changing any of those starts from a
+clean slate.
+
+Entries expire after ``PROPERTY_CACHE_TTL_S`` and the least recently used ones
+are evicted once the stored JSON exceeds ``PROPERTY_CACHE_MAX_MB``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from scan2wall.sqlite_local import LocalConnection
+
+PROPERTY_CACHE_ENABLED = os.getenv("PROPERTY_CACHE", "1") != "0"
+PROPERTY_CACHE_PATH = Path(os.getenv("PROPERTY_CACHE_PATH", str(Path(__file__).resolve().parent / "property_cache.db")))
+PROPERTY_CACHE_MAX_MB = float(os.getenv("PROPERTY_CACHE_MAX_MB", "64"))
+PROPERTY_CACHE_TTL_S = float(os.getenv("PROPERTY_CACHE_TTL_S", str(30 * 24 * 3600)))
+
+
+def image_key(image_bytes: bytes, model_name: str, prompt_version: str, preprocess: str = "") -> str:
+    """Cache key of the original image bytes; *preprocess* names how they were compacted for the model."""
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return hashlib.sha256(f"{digest}:{model_name}:{prompt_version}:{preprocess}".encode("utf-8")).hexdigest()
+
+
+class PropertyCache:
+    """Size- and TTL-bounded LRU of property dicts. Safe to share between threads."""
+
+    def __init__(
+        self,
+        db_path: Path = PROPERTY_CACHE_PATH,
+        max_bytes: int = int(PROPERTY_CACHE_MAX_MB * 1024 * 1024),
+        ttl_s: float = PROPERTY_CACHE_TTL_S,
+        enabled: bool = PROPERTY_CACHE_ENABLED,
+    ):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self._conn = LocalConnection(self.db_path)
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "miss": 0, "evicted": 0}
+        if enabled:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS properties ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn().execute("CREATE INDEX IF NOT EXISTS idx_properties_used ON properties (used_at)")
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += n
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, created_at FROM properties WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl_s:
+            self._count("miss")
+            return None
+        conn.execute("UPDATE properties SET used_at = ? WHERE key = ?", (now, key))
+        self._count("hit")
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        blob = json.dumps(value)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO properties (key, value, size, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            self._count("evicted", evicted)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        """Drop expired entries, then least recently used ones until under ``max_bytes``."""
+        evicted = conn.execute("DELETE FROM properties WHERE created_at < ?", (now - self.ttl_s,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM properties").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+        for key, size in conn.execute("SELECT key, size FROM properties ORDER BY used_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM properties WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counts since the process started."""
+        with self._lock:
+            return dict(self._counts)
+
+
+_CACHE: Optional[PropertyCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def open_property_cache() -> PropertyCache:
+    """The process-wide cache at ``PROPERTY_CACHE_PATH``, opened on first use."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PropertyCache()
+        return _CACHE
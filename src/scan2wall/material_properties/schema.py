@@ -0,0 +1,98 @@
+"""Strict validation of property estimates.
+
+Gemini is asked for a fixed JSON schema but occasionally returns prose,
+truncated JSON, strings where numbers belong, or drops a field. The pipeline
+indexes straight into the dict, so an answer is only accepted once every
+field it relies on is present, typed and in range.
+"""
+from __future__ import annotations
+
+import json
+from numbers import Real
+from typing import Any, List, Optional
+
+RIGIDITY = ("rigid", "deformable")
+
+
+class InvalidProperties(ValueError):
+    """An answer that is not valid JSON or does not match the schema."""
+
+    def __init__(self, problems: List[str], raw: Optional[str] = None):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+        self.raw = raw
+
+
+def _number(value: Any) -> bool:
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+def _check_range(problems: List[str], path: str, value: Any, low: float, high: Optional[float] = None,
+                 exclusive_low: bool = False) -> None:
+    if not _number(value):
+        problems.append(f"{path} must be a number, got {value!r}")
+    elif value < low or (exclusive_low and value == low) or (high is not None and value > high):
+        bound = f"{'>' if exclusive_low else '>='} {low:g}" + (f" and <= {high:g}" if high is not None else "")
+        problems.append(f"{path} must be {bound}, got {value!r}")
+
+
+def validate_properties(result: Any) -> List[str]:
+    """Problems with *result*, as readable strings; empty when it matches the schema."""
+    if not isinstance(result, dict):
+        return [f"expected a JSON object, got {type(result).__name__}"]
+    problems: List[str] = []
+
+    if not isinstance(result.get("object_type"), str) or not result["object_type"].strip():
+        problems.append("object_type must be a non-empty string")
+    if "use_case" in result and not isinstance(result["use_case"], str):
+        problems.append("use_case must be a string")
+    if result.get("rigidity") not in RIGIDITY:
+        problems.append(f"rigidity must be one of {', '.join(RIGIDITY)}")
+
+    materials = result.get("materials")
+    if not isinstance(materials, list):
+        problems.append("materials must be a list")
+    else:
+        for i, material in enumerate(materials):
+            if not isinstance(material, dict) or not isinstance(material.get("name"), str):
+                problems.append(f"materials[{i}] must be an object with a string name")
+            else:
+                _check_range(problems, f"materials[{i}].prob", material.get("prob"), 0, 1)
+
+    dims = result.get("dimensions_m")
+    if not isinstance(dims, dict):
+        problems.append("dimensions_m must be an object")
+    else:
+        for axis in ("length", "width", "height"):
+            value = dims.get(axis).get("value") if isinstance(dims.get(axis), dict) else None
+            _check_range(problems, f"dimensions_m.{axis}.value", value, 0, exclusive_low=True)
+
+    weight = result.get("weight_kg")
+    _check_range(problems, "weight_kg.value", weight.get("value") if isinstance(weight, dict) else None,
+                 0, exclusive_low=True)
+
+    friction = result.get("friction_coefficients")
+    if not isinstance(friction, dict):
+        problems.append("friction_coefficients must be an object")
+    else:
+        for kind in ("static", "dynamic"):
+            _check_range(problems, f"friction_coefficients.{kind}", friction.get(kind), 0, 2)
+
+    if "assumptions" in result and not (
+        isinstance(result["assumptions"], list) and all(isinstance(a, str) for a in result["assumptions"])
+    ):
+        problems.append("assumptions must be a list of strings")
+    _check_range(problems, "confidence_overall", result.get("confidence_overall"), 0, 1)
+    return problems
+
+
+def parse_properties(text: str) -> dict:
+    """The property dict in *text*, or ``InvalidProperties`` saying what is wrong with it."""
+    try:
+        result = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise InvalidProperties([f"invalid JSON: {e}"], text)
+    problems = validate_properties(result)
+    if problems:
+        raise InvalidProperties(problems, text)
+    return result
@@ -0,0 +1,36 @@
+"""Per-thread SQLite connections for the stores shared by the server's threads.
+
+The job store, the property cache and the asset catalog are used from the
+event loop, the threadpool and the pipeline workers alike. A ``sqlite3``
+connection must stay on the thread that opened it, so each store keeps one
+connection per thread, opened on first use.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class LocalConnection:
+    """Calling it returns this thread's connection to *db_path*.
+
+    Connections are in autocommit mode (callers open transactions explicitly),
+    use WAL journaling with ``synchronous=NORMAL`` so readers never block the
+    writer, and return ``sqlite3.Row`` rows.
+    """
+
+    def __init__(self, db_path: Path, timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
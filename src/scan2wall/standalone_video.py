@@ -5,6 +5,9 @@ import requests
 import re
 import subprocess
 import os
+import sys
+
+from scan2wall.asset_catalog import open_catalog
 
 def make_throwing_anim(file, scaling=1.0):
     print("Creating throwing anim")
@@ -22,12 +25,8 @@ def make_throwing_anim(file, scaling=1.0):
 
 
 if __name__ == "__main__":
-    object = "pen"
-    with open(
-        "/workspace/scan2wall/assets.csv", "r"
-    ) as f:
-        for line in f:
-            if object in line:
-                obj_path = line.strip().split(",")[-1]
-                make_throwing_anim(obj_path, scaling=float(line.strip().split(",")[1]))
-                break
\ No newline at end of file
+    object = sys.argv[1] if len(sys.argv) > 1 else "pen"
+    asset = open_catalog().latest(object)
+    if asset is None:
+        sys.exit(f"No cataloged asset of type {object!r}")
+    make_throwing_anim(asset.usd_file, scaling=asset.scaling)